@@ -5,49 +5,328 @@ pycat.py – a simple clone of the Unix 'cat' command.
 Usage:
     python3 pycat.py file.txt
     python3 pycat.py file1.txt file2.txt ...
+    python3 pycat.py [-n] [-s] [-A] file.txt
+    python3 pycat.py -f service.log other.log
     echo "hello" | python3 pycat.py
+
+Options:
+    -n    number all output lines
+    -s    squeeze repeated empty lines into one
+    -A    show non-printing characters: tabs as ^I, line ends as $
+    -f, --follow
+          keep printing what is appended to the files, like 'tail -f';
+          notices truncation and rotation (the file being replaced)
 """
 
+import errno
+import os
+import struct
 import sys
+import time
 
-def main():
-    # If arguments are provided, treat them as file paths to concatenate
-    if len(sys.argv) > 1:
-        for filepath in sys.argv[1:]:
-            try:
-                # Open in binary mode so we can handle any file type (text, images, etc.)
-                with open(filepath, 'rb') as f:
-                    # Copy file content to stdout in chunks (memory-efficient)
-                    while True:
-                        chunk = f.read(8192)
-                        if not chunk:
-                            break
-                        sys.stdout.buffer.write(chunk)
-            except FileNotFoundError:
-                print(f"pycat.py: {filepath}: No such file or directory",
-                      file=sys.stderr)
-                sys.exit(1)
-            except PermissionError:
-                print(f"pycat.py: {filepath}: Permission denied",
-                      file=sys.stderr)
-                sys.exit(1)
-            except Exception as e:
-                print(f"pycat.py: {filepath}: {e}", file=sys.stderr)
-                sys.exit(1)
-    else:
-        # No filename arguments: read from standard input
+MIN_BUFFER = 128 * 1024
+MAX_BUFFER = 4 * 1024 * 1024
+FORMAT_BUFFER = 256 * 1024  # -n/-s/-A run several passes over each buffer; this size keeps it in cache
+SENDFILE_CHUNK = 1 << 30
+
+# --follow: inotify event bits (see <sys/inotify.h>) for a watched directory's entries
+IN_MODIFY, IN_ATTRIB, IN_MOVED_FROM, IN_MOVED_TO = 0x002, 0x004, 0x040, 0x080
+IN_CREATE, IN_DELETE, IN_Q_OVERFLOW = 0x100, 0x200, 0x4000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")
+RECHECK_SECONDS = 5.0  # Even with inotify, look at every file this often (e.g. for network filesystems)
+POLL_MIN_SECONDS, POLL_MAX_SECONDS = 0.05, 1.0  # Fallback poller: back off while nothing changes
+
+# Errors meaning "this kind of descriptor can't do zero-copy", not "the copy failed"
+ZERO_COPY_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF, errno.EXDEV}
+
+# -A rendering of every byte that isn't printable ASCII or a newline (same notation as GNU cat -A)
+def _caret(byte):
+    prefix = b""
+    if byte >= 128:
+        prefix, byte = b"M-", byte - 128
+    if byte < 32: return prefix + b"^" + bytes([byte + 64])
+    if byte == 127: return prefix + b"^?"
+    return prefix + bytes([byte])
+
+VISIBLE = [_caret(b) for b in range(256)]
+PRINTABLE = bytes(range(0x20, 0x7f)) + b"\n"
+
+
+def write_all(out_fd, data):
+    """os.write() may write only part of the data (pipes, signals); keep going until it's all out."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(out_fd, view):]
+
+
+def zero_copy(in_fd, out_fd):
+    """
+    Copies in_fd to out_fd inside the kernel, with sendfile (regular file in) or
+    splice (a pipe on either side). Returns False, having copied nothing, if neither works.
+    """
+    for name in ("sendfile", "splice"):
+        if not hasattr(os, name): continue
+        copied = 0
         try:
             while True:
-                chunk = sys.stdin.buffer.read(8192)
-                if not chunk:
-                    break
-                sys.stdout.buffer.write(chunk)
-        except KeyboardInterrupt:
-            # Mimic the exit code typically used when a process is interrupted
-            sys.exit(130)
-        except Exception as e:
-            print(f"pycat.py: {e}", file=sys.stderr)
-            sys.exit(1)
+                if name == "sendfile": n = os.sendfile(out_fd, in_fd, None, SENDFILE_CHUNK)
+                else: n = os.splice(in_fd, out_fd, SENDFILE_CHUNK)
+                if n == 0: return True
+                copied += n
+        except OSError as e:
+            if copied or e.errno not in ZERO_COPY_UNSUPPORTED: raise
+    return False
+
+
+def read_chunks(in_fd, max_size=MAX_BUFFER):
+    """Yields the data of in_fd in blocks, growing the buffer (up to max_size) while reads keep filling it."""
+    size = min(MIN_BUFFER, max_size)
+    while True:
+        chunk = os.read(in_fd, size)
+        if not chunk: return
+        yield chunk
+        if len(chunk) == size and size < max_size: size *= 2
+
+
+class Formatter:
+    """
+    Applies -n/-s/-A to whole buffers at a time. Input is cut at the last newline of each
+    buffer, so every transformation sees complete lines; the rest is carried over, across
+    files too, because cat treats its inputs as one stream.
+    """
+
+    def __init__(self, number, squeeze, show_all):
+        self.number, self.squeeze, self.show_all = number, squeeze, show_all
+        self.line_number = 0
+        self.previous_blank = False
+        self.carry = b""
+
+    def feed(self, chunk):
+        data = self.carry + chunk
+        cut = data.rfind(b"\n") + 1
+        self.carry = data[cut:]
+        return self._format(data[:cut]) if cut else b""
+
+    def finish(self):
+        data, self.carry = self.carry, b""
+        return self._format(data) if data else b""
+
+    def _format(self, data):
+        if self.squeeze:
+            # Lead with the end of the previous line (plus a blank line if that's what it was), so
+            # runs of blank lines that span buffers are squeezed too; then drop that lead again.
+            lead = b"\n\n" if self.previous_blank else b"\n"
+            data = lead + data
+            while b"\n\n\n" in data: data = data.replace(b"\n\n\n", b"\n\n")
+            self.previous_blank = data.endswith(b"\n\n")
+            data = data[len(lead):]
+            if not data: return b""
+        if self.show_all:
+            # One C-level replace() per distinct non-printing byte; the replacements are all printable
+            for byte in set(data.translate(None, PRINTABLE)):
+                data = data.replace(bytes([byte]), VISIBLE[byte])
+            data = data.replace(b"\n", b"$\n")
+        if self.number:
+            # Prefixes and lines are interleaved by C-level iterators; no Python code runs per line
+            lines = data.split(b"\n")
+            if not lines[-1]: lines.pop()  # Nothing after the final newline
+            start = self.line_number + 1
+            self.line_number += len(lines)
+            prefixes = map(b"%6d\t".__mod__, range(start, self.line_number + 1))
+            numbered = b"\n".join(map(bytes.__add__, prefixes, lines))
+            data = numbered + b"\n" if data.endswith(b"\n") else numbered
+        return data
+
+
+def copy(in_fd, out_fd, formatter):
+    if formatter is None:
+        if zero_copy(in_fd, out_fd): return
+        for chunk in read_chunks(in_fd): write_all(out_fd, chunk)
+    else:
+        for chunk in read_chunks(in_fd, FORMAT_BUFFER): write_all(out_fd, formatter.feed(chunk))
+
+
+class FollowedFile:
+    """One file being followed: an open descriptor plus the identity of the file it refers to."""
+
+    def __init__(self, path, fd, formatter):
+        self.path, self.fd, self.formatter = path, fd, formatter
+        self.name = os.path.basename(path)
+        self.directory = os.path.dirname(os.path.abspath(path))
+        stat = os.fstat(fd)
+        self.identity = (stat.st_dev, stat.st_ino)
+
+    def check(self, output):
+        """Prints whatever is new. Handles truncation and rotation. Returns True if anything was printed."""
+        changed = self.drain(output)
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return changed  # Deleted or moved away; keep the old file until a new one appears
+        if (stat.st_dev, stat.st_ino) != self.identity:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except OSError:
+                return changed
+            changed = self.drain(output) or changed  # Last words written to the old file
+            os.close(self.fd)
+            self.fd = fd
+            self.identity = (stat.st_dev, stat.st_ino)
+            print(f"pycat.py: {self.path}: file replaced; following the new file", file=sys.stderr)
+            changed = self.drain(output) or changed
+        return changed
+
+    def drain(self, output):
+        size = os.fstat(self.fd).st_size
+        position = os.lseek(self.fd, 0, os.SEEK_CUR)
+        if size < position:
+            print(f"pycat.py: {self.path}: file truncated", file=sys.stderr)
+            position = os.lseek(self.fd, 0, os.SEEK_SET)
+        if size == position: return False
+        output.switch_to(self)
+        copy(self.fd, output.fd, self.formatter)
+        return True
+
+
+class FollowOutput:
+    """Writes '==> name <==' headers, like tail, whenever output switches to another of several files."""
+
+    def __init__(self, fd, show_headers):
+        self.fd, self.show_headers, self.current = fd, show_headers, None
+
+    def switch_to(self, followed):
+        if self.show_headers and followed is not self.current:
+            separator = b"" if self.current is None else b"\n"
+            write_all(self.fd, separator + f"==> {followed.path} <==\n".encode())
+        self.current = followed
+
+
+def open_inotify(directories):
+    """Returns (inotify fd, {watch descriptor: directory}), or None when inotify isn't available."""
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None  # Not Linux (or not glibc/musl)
+    fd = init(os.O_CLOEXEC)
+    if fd < 0: return None
+    watches = {}
+    for directory in directories:
+        wd = add_watch(fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            os.close(fd)  # e.g. the per-user watch limit is used up; poll instead
+            return None
+        watches[wd] = directory
+    return fd, watches
+
+
+def follow(files, output):
+    """Follows files until interrupted, woken by inotify where possible and by a backing-off poller otherwise."""
+    # Watch first, then catch up: whatever is appended in between still raises an event
+    inotify = open_inotify({f.directory for f in files})
+    for followed in files: followed.check(output)
+    if inotify is None:
+        delay = POLL_MIN_SECONDS
+        while True:
+            time.sleep(delay)
+            changed = False
+            for followed in files: changed = followed.check(output) or changed
+            delay = POLL_MIN_SECONDS if changed else min(delay * 2, POLL_MAX_SECONDS)
+
+    import select
+    fd, watches = inotify
+    by_entry = {(f.directory, os.fsencode(f.name)): f for f in files}
+    poller = select.poll()
+    poller.register(fd, select.POLLIN)
+    try:
+        while True:
+            if not poller.poll(RECHECK_SECONDS * 1000):
+                for followed in files: followed.check(output)
+                continue
+            data, offset, touched = os.read(fd, 65536), 0, set()
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+                offset += INOTIFY_EVENT.size + length
+                if mask & IN_Q_OVERFLOW: touched.update(files); continue
+                followed = by_entry.get((watches.get(wd), name))
+                if followed: touched.add(followed)
+            for followed in files:  # In command-line order, so output stays predictable
+                if followed in touched: followed.check(output)
+    finally:
+        os.close(fd)
+
+
+def open_input(filepath):
+    """Opens a file for reading, or reports why it can't be read and exits."""
+    try:
+        if os.path.isdir(filepath): raise IsADirectoryError(filepath)
+        # Open in binary mode so we can handle any file type (text, images, etc.)
+        return os.open(filepath, os.O_RDONLY)
+    except FileNotFoundError:
+        print(f"pycat.py: {filepath}: No such file or directory",
+              file=sys.stderr)
+        sys.exit(1)
+    except PermissionError:
+        print(f"pycat.py: {filepath}: Permission denied",
+              file=sys.stderr)
+        sys.exit(1)
+    except IsADirectoryError:
+        print(f"pycat.py: {filepath}: Is a directory", file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    options, paths = set(), []
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--":
+            paths.extend(args); break
+        if arg == "--follow":
+            options.add("f"); continue
+        if arg.startswith("-") and len(arg) > 1:
+            unknown = set(arg[1:]) - set("nsAf")
+            if unknown:
+                print(f"pycat.py: invalid option -- '{sorted(unknown)[0]}'", file=sys.stderr)
+                sys.exit(1)
+            options.update(arg[1:])
+        else:
+            paths.append(arg)
+
+    following = "f" in options
+    options.discard("f")
+    new_formatter = lambda: Formatter("n" in options, "s" in options, "A" in options) if options else None
+    formatter = new_formatter()
+    sys.stdout.flush()  # Everything below writes to the descriptor directly
+    out_fd = sys.stdout.fileno()
+
+    try:
+        if following and [p for p in paths if p != "-"]:
+            # Each followed file gets its own formatter: their lines interleave as they arrive
+            files = [FollowedFile(p, open_input(p), new_formatter()) for p in paths if p != "-"]
+            follow(files, FollowOutput(out_fd, len(files) > 1))
+
+        # If arguments are provided, treat them as file paths to concatenate ('-' is stdin)
+        for filepath in paths or ["-"]:
+            if filepath == "-":
+                copy(sys.stdin.fileno(), out_fd, formatter)
+                continue
+            fd = open_input(filepath)
+            try: copy(fd, out_fd, formatter)
+            finally: os.close(fd)
+        if formatter: write_all(out_fd, formatter.finish())
+    except BrokenPipeError:
+        # Whoever reads our output has gone away; like cat on SIGPIPE, there is nothing left to do.
+        pass
+    except KeyboardInterrupt:
+        # Mimic the exit code typically used when a process is interrupted
+        sys.exit(130)
+    except Exception as e:
+        print(f"pycat.py: {e}", file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
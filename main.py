@@ -4,19 +4,21 @@
 # download
 # Use code with caution.
 # IGNORE_WHEN_COPYING_END
+import time
+_MODULE_STARTED_AT = time.perf_counter()  # For the --startup-profile import timing
+
 import os
-import platform
+import sys
 import shutil
 import json
-import inspect
 import subprocess
-import requests
-from urllib.parse import urlparse
-import time
-import random
-import traceback
 import shlex
 import re
+import threading
+
+# Heavy or rarely needed modules (requests, random, traceback, tempfile,
+# hashlib, concurrent.futures, urllib.parse) are imported inside the commands
+# that use them, so plain startup never pays for them.
 
 # Attempt to import readline for command history and better input
 try:
@@ -28,6 +30,1032 @@ except ImportError:
         readline = None  # No readline library found
 
 
+def _write_atomic(path, text):
+    """
+    Replaces path with text in one step, so readers see the old file or the new one, never a partial write.
+    The temporary file is named per process and thread, so concurrent writers don't clobber each other's.
+    """
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_file, path)
+    except BaseException:
+        try: os.remove(tmp_file)
+        except OSError: pass
+        raise
+
+
+def _write_json_atomic(path, data):
+    """Atomically writes data to path as JSON (see _write_atomic)."""
+    _write_atomic(path, json.dumps(data))
+
+
+class SharedIndexFile:
+    """
+    A JSON object on disk that several processes update at once (forked daemon sessions, other shells).
+    Changes are recorded per key and, on save, merged into whatever the file holds by then, under an
+    exclusive lock on a side file, so no writer drops the entries another one added meanwhile.
+    Keys live at the top level, or in one of the named sections (nested objects).
+    """
+
+    _DELETED = object()
+
+    def __init__(self, path, sections=()):
+        self.path = path
+        self.sections = sections
+        self.data = None  # Loaded on first use
+        self._changes = {}  # (section or None, key) -> value or _DELETED, not saved yet
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict): data = {}
+        for section in self.sections:
+            if not isinstance(data.get(section), dict): data[section] = {}
+        return data
+
+    def load(self):
+        """Returns the index as last read or saved by this process."""
+        if self.data is None: self.data = self._read()
+        return self.data
+
+    def set(self, key, value, section=None):
+        (self.load()[section] if section else self.load())[key] = value
+        self._changes[(section, key)] = value
+
+    def delete(self, key, section=None):
+        (self.load()[section] if section else self.load()).pop(key, None)
+        self._changes[(section, key)] = self._DELETED
+
+    def save(self, adjust=None):
+        """
+        Merges this process's changes into the file's current contents and writes the result back.
+        adjust() runs on the merged index before it is written (e.g. to evict entries) and may change it too.
+        Errors are ignored: the index is only a cache.
+        """
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None  # Windows: changes are still merged, just without the lock
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".lock", "a") as lock_file:
+                if fcntl: fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file is closed
+                merged = self._read()
+                for (section, key), value in self._changes.items():
+                    target = merged[section] if section else merged
+                    if value is self._DELETED: target.pop(key, None)
+                    else: target[key] = value
+                self.data = merged
+                if adjust: adjust()
+                self._changes = {}
+                _write_json_atomic(self.path, merged)
+        except OSError:
+            pass
+
+    def reset(self):
+        """Forgets the index (after its file was deleted) and any unsaved changes."""
+        self.data, self._changes = None, {}
+
+
+class DownloadCache:
+    """
+    An on-disk cache of downloaded files keyed by URL. Entries are revalidated
+    with ETag/Last-Modified, bodies are stored once per SHA-256 hash, and the
+    least recently used bodies are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self.max_bytes = max_bytes
+        self.hits, self.misses = 0, 0
+        self._lock = threading.Lock()
+        self._index = SharedIndexFile(self.index_file)  # {url: {"sha256", "etag", "last_modified", "size", "last_used"}}
+
+    def _load(self):
+        """Returns the URL index, reading it from disk the first time. Caller must hold the lock."""
+        return self._index.load()
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256)
+
+    def conditional_headers(self, url):
+        """Returns the If-None-Match/If-Modified-Since headers for a cached URL (empty if not cached)."""
+        with self._lock:
+            entry = self._load().get(url)
+            if not entry or not os.path.isfile(self._blob_path(entry["sha256"])): return {}
+            headers = {}
+            if entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def restore(self, url, filepath, sha256=None):
+        """
+        Copies the cached body of a URL to filepath. Returns False if it is no longer cached,
+        or if sha256 is given and the cached body (stored under its hash) is a different one.
+        """
+        with self._lock:
+            entry = self._load().get(url)
+            if not entry or (sha256 and entry["sha256"] != sha256): return False
+            self._index.set(url, dict(entry, last_used=time.time()))
+            blob = self._blob_path(entry["sha256"])
+        try:
+            shutil.copyfile(blob, filepath)
+        except OSError:
+            return False
+        with self._lock:
+            self.hits += 1
+            self._index.save()
+        return True
+
+    def store(self, url, filepath, sha256, etag, last_modified):
+        """Records a freshly downloaded file. Responses without validators can't be revalidated and are skipped."""
+        with self._lock: self.misses += 1
+        if not (etag or last_modified): return
+        try:
+            size = os.path.getsize(filepath)
+            if size > self.max_bytes: return
+            blob = self._blob_path(sha256)
+            if not os.path.exists(blob):
+                os.makedirs(self.objects_dir, exist_ok=True)
+                tmp_blob = f"{blob}.{threading.get_ident()}.tmp"
+                shutil.copyfile(filepath, tmp_blob)
+                os.replace(tmp_blob, blob)
+        except OSError:
+            return
+        with self._lock:
+            self._index.set(url, {"sha256": sha256, "etag": etag, "last_modified": last_modified,
+                                  "size": size, "last_used": time.time()})
+            self._index.save(adjust=self._evict)  # Evicts from the merged index: other processes' entries count too
+
+    def _evict(self):
+        """Removes least recently used bodies until the cache fits max_bytes. Caller must hold the lock."""
+        objects = {}
+        for entry in self._index.data.values():
+            obj = objects.setdefault(entry["sha256"], [entry["size"], 0])
+            obj[1] = max(obj[1], entry["last_used"])
+        total = sum(size for size, _ in objects.values())
+        for sha256, (size, _) in sorted(objects.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes: break
+            for url in [u for u, e in self._index.data.items() if e["sha256"] == sha256]:
+                self._index.delete(url)
+            try: os.remove(self._blob_path(sha256))
+            except OSError: pass
+            total -= size
+
+    def stats(self):
+        """Returns a dictionary describing the cache contents and this session's hit/miss counts."""
+        with self._lock:
+            index = self._load()
+            objects = {entry["sha256"]: entry["size"] for entry in index.values()}
+            return {"entries": len(index), "objects": len(objects), "bytes": sum(objects.values()),
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Deletes every cached file and returns the number of bytes freed."""
+        freed = self.stats()["bytes"]
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._index.reset()
+        return freed
+
+
+class BuildCache:
+    """
+    Compiled build outputs stored under a hash of the source content and the
+    toolchain version, so unchanged sources are never compiled twice. Each entry
+    is a directory holding whatever the compiler produced.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self.hits, self.misses = 0, 0
+        self._lock = threading.Lock()
+        # {"entries": {key: {...}}, "toolchains": {path: {"mtime_ns", "version"}}}
+        self._index = SharedIndexFile(self.index_file, sections=("entries", "toolchains"))
+
+    def _load(self):
+        """Returns the build index, reading it from disk the first time. Caller must hold the lock."""
+        return self._index.load()
+
+    @staticmethod
+    def make_key(kind, toolchain_version, input_files, root=None):
+        """
+        Hashes the build kind, toolchain version and the names and contents of every input file.
+        Names are taken relative to root when given (so moving a file within a source tree changes the key).
+        """
+        import hashlib
+        digest = hashlib.sha256(f"{kind}\0{toolchain_version}\0".encode())
+        for path in input_files:
+            digest.update((os.path.relpath(path, root) if root else os.path.basename(path)).encode() + b"\0")
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""): digest.update(chunk)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, key):
+        """Returns the output directory of a cached build, or None if the key hasn't been built yet."""
+        entry_dir = os.path.join(self.cache_dir, key)
+        with self._lock:
+            entry = self._load()["entries"].get(key)
+            if not entry or not os.path.isdir(entry_dir): return None
+            self._index.set(key, dict(entry, last_used=time.time()), section="entries")
+            self.hits += 1
+            self._index.save()
+        return entry_dir
+
+    def new_build_dir(self):
+        """Creates a scratch directory for the compiler to write into, to be handed to store()."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        import tempfile
+        return tempfile.mkdtemp(prefix=".build-", dir=self.cache_dir)
+
+    def store(self, key, build_dir, source_file):
+        """Moves a finished build directory into the cache and returns its final location."""
+        entry_dir = os.path.join(self.cache_dir, key)
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(build_dir) for name in names)
+        with self._lock:
+            if os.path.isdir(entry_dir): shutil.rmtree(build_dir, ignore_errors=True)
+            else: os.rename(build_dir, entry_dir)
+            self._index.set(key, {"source": os.path.abspath(source_file), "size": size,
+                                  "created": time.time(), "last_used": time.time()}, section="entries")
+            self.misses += 1
+            self._index.save()
+        return entry_dir
+
+    def toolchain_version(self, path, probe):
+        """Returns a toolchain's version string, only running probe() when the executable has changed."""
+        mtime_ns = os.stat(os.path.realpath(path)).st_mtime_ns
+        with self._lock:
+            known = self._load()["toolchains"].get(path)
+            if known and known.get("mtime_ns") == mtime_ns: return known["version"]
+        version = probe()
+        with self._lock:
+            self._index.set(path, {"mtime_ns": mtime_ns, "version": version}, section="toolchains")
+            self._index.save()
+        return version
+
+    def stats(self):
+        """Returns a dictionary describing the cache contents and this session's hit/miss counts."""
+        with self._lock:
+            entries = self._load()["entries"]
+            return {"entries": len(entries), "bytes": sum(e.get("size", 0) for e in entries.values()),
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Deletes every cached build and returns the number of bytes freed."""
+        freed = self.stats()["bytes"]
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._index.reset()
+        return freed
+
+
+class RepositoryIndex:
+    """
+    The application repository: name -> entry ({"name", "url", "version", "description", "tags"}).
+    Reads the structured JSON format as well as the original repo.txt format of alternating
+    name and URL lines. 'repo search' uses a name list sorted once (prefix lookups by
+    bisection) and a trigram index over names, tags and descriptions, built on first use.
+    """
+    FORMAT_VERSION = 1
+
+    def __init__(self, entries=(), structured=False):
+        self.entries = {entry["name"]: entry for entry in entries}
+        self.structured = structured  # Saved as JSON if True, else as name/URL lines
+        self._names = None
+        self._words = None  # Sorted [(word, name)] for short (prefix) search terms
+        self._trigrams = None  # trigram -> {name, ...}
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parses either repository format. Returns (index, problems); problems are human-readable warnings
+        about skipped entries. Raises ValueError if the JSON index itself is malformed.
+        """
+        if text.lstrip().startswith(("{", "[")):
+            data = json.loads(text)
+            if not isinstance(data, dict): raise ValueError("the repository index must be a JSON object")
+            apps = data.get("apps", [])
+            if not isinstance(apps, list): raise ValueError("'apps' in the repository index must be a list")
+            entries, problems = [], []
+            for item in apps:
+                problem = cls._entry_problem(item)
+                if problem:
+                    label = f"'{item['name']}'" if isinstance(item, dict) and isinstance(item.get("name"), str) else repr(item)
+                    problems.append(f"Skipping entry {label}: {problem}"); continue
+                entries.append(cls.make_entry(item["name"], item["url"], item.get("version"),
+                                              item.get("description"), item.get("tags")))
+            return cls(entries, structured=True), problems
+
+        lines = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith('#')]
+        problems = []
+        if len(lines) % 2 != 0:
+            problems.append("Malformed repo file. Ignoring last.")
+            lines = lines[:-1]
+        return cls(cls.make_entry(lines[i], lines[i + 1]) for i in range(0, len(lines), 2)), problems
+
+    @staticmethod
+    def _entry_problem(item):
+        """What is wrong with one JSON index entry, or None if it is usable."""
+        if not isinstance(item, dict): return "entries must be objects"
+        for key in ("name", "url"):
+            if not isinstance(item.get(key), str) or not item[key].strip(): return f"'{key}' must be a non-empty string"
+        version = item.get("version")
+        if version is not None and (isinstance(version, bool) or not isinstance(version, (str, int, float))):
+            return "'version' must be a string or a number"
+        if not isinstance(item.get("description", ""), (str, type(None))): return "'description' must be a string"
+        tags = item.get("tags", [])
+        if tags is not None and (not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags)):
+            return "'tags' must be a list of strings"
+        return None
+
+    @staticmethod
+    def make_entry(name, url, version=None, description=None, tags=None):
+        return {"name": name, "url": url, "version": str(version) if version is not None else None,
+                "description": description or "", "tags": [str(tag) for tag in tags or []]}
+
+    def dump(self):
+        """The repository file content, in the format it was loaded from."""
+        if not self.structured:
+            return "".join(f"{name}\n{self.entries[name]['url']}\n" for name in self.names())
+        apps = [{key: value for key, value in self.entries[name].items() if value} for name in self.names()]
+        return json.dumps({"format": self.FORMAT_VERSION, "apps": apps}, indent=2) + "\n"
+
+    def __len__(self): return len(self.entries)
+    def __contains__(self, name): return name in self.entries
+    def get(self, name): return self.entries.get(name)
+
+    def names(self):
+        """All entry names, sorted (once per change, not per listing)."""
+        if self._names is None: self._names = sorted(self.entries)
+        return self._names
+
+    def add(self, entry):
+        self.entries[entry["name"]] = entry
+        self._names = self._words = self._trigrams = None
+
+    def remove(self, name):
+        del self.entries[name]
+        self._names = self._words = self._trigrams = None
+
+    @staticmethod
+    def _haystack(entry):
+        return " ".join([entry["name"], *entry["tags"], entry["description"]]).lower()
+
+    def _build_search_index(self):
+        words, trigrams = set(), {}
+        for name, entry in self.entries.items():
+            haystack = self._haystack(entry)
+            words.update((word, name) for word in re.findall(r"[\w.+-]+", haystack))
+            for i in range(len(haystack) - 2):
+                trigrams.setdefault(haystack[i:i + 3], set()).add(name)
+        self._words, self._trigrams = sorted(words), trigrams
+
+    def search(self, query):
+        """Entries matching every term of the query, best first (exact name, name prefix, name, tags, description)."""
+        import bisect
+        terms = query.lower().split()
+        if not terms: return []
+        if self._trigrams is None: self._build_search_index()
+        matches = None
+        for term in terms:
+            if len(term) < 3:
+                # Too short for trigrams: any word starting with the term
+                start = bisect.bisect_left(self._words, (term,))
+                found = set()
+                for word, name in self._words[start:]:
+                    if not word.startswith(term): break
+                    found.add(name)
+            else:
+                postings = [self._trigrams.get(term[i:i + 3], set()) for i in range(len(term) - 2)]
+                candidates = set.intersection(*sorted(postings, key=len))
+                found = {name for name in candidates if term in self._haystack(self.entries[name])}
+            matches = found if matches is None else matches & found
+            if not matches: return []
+
+        first = terms[0]
+        def rank(name):
+            entry, lowered = self.entries[name], name.lower()
+            if lowered == first: return 0, name
+            if lowered.startswith(first): return 1, name
+            if first in lowered: return 2, name
+            if any(first in tag.lower() for tag in entry["tags"]): return 3, name
+            return 4, name
+        return [self.entries[name] for name in sorted(matches, key=rank)]
+
+
+class TreeRemover:
+    """
+    Deletes files and directory trees with a pool of threads: directories are scanned
+    with os.scandir and their files unlinked in batches (both release the GIL), then the
+    emptied directories are removed deepest first. discard() instead renames a tree into
+    a trash directory, which returns at once, and deletes it on a background thread.
+    """
+    UNLINK_BATCH = 256
+    PROGRESS_INTERVAL = 0.2
+
+    def __init__(self, trash_dir, max_workers):
+        self.trash_dir = trash_dir
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._purger = None
+        self._purge_again = False
+
+    def remove(self, paths, progress=None):
+        """
+        Deletes the given paths (directories recursively; symlinks are never followed).
+        Calls progress(files, bytes, seconds) every PROGRESS_INTERVAL while it runs.
+        Returns (files, bytes, errors): errors don't stop the rest from being deleted.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        started = last_report = time.perf_counter()
+        files_done, bytes_done, errors = 0, 0, []
+        directories = {}  # depth -> [path, ...]
+
+        def scan(path):
+            names, subdirs = [], []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try: is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError: is_dir = False
+                    if is_dir: subdirs.append(entry.path)
+                    else: names.append(entry.name)
+            return names, subdirs
+
+        def unlink(directory, names):
+            # Relative to an open directory, so the kernel doesn't walk the whole path for every file
+            count, size, failed = 0, 0, []
+            dir_fd = os.open(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)) if os.unlink in os.supports_dir_fd else None
+            try:
+                for name in names:
+                    path = name if dir_fd is not None else os.path.join(directory, name)
+                    try:
+                        size += os.stat(path, dir_fd=dir_fd, follow_symlinks=False).st_size
+                        os.unlink(path, dir_fd=dir_fd); count += 1
+                    except FileNotFoundError: pass
+                    except OSError as e: failed.append(e)
+            finally:
+                if dir_fd is not None: os.close(dir_fd)
+            return count, size, failed
+
+        def rmdir(path):
+            try: os.rmdir(path)
+            except FileNotFoundError: pass
+            except OSError as e: return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            for path in paths:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    directories.setdefault(0, []).append(path)
+                    running[pool.submit(scan, path)] = (path, 0)
+                else:
+                    directory, name = os.path.split(os.path.abspath(path))
+                    running[pool.submit(unlink, directory, [name])] = None
+
+            while running:
+                done, _ = wait(running, timeout=self.PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scanned = running.pop(future)
+                    try: result = future.result()
+                    except OSError as e: errors.append(e); continue
+                    if scanned is None:
+                        files_done += result[0]; bytes_done += result[1]; errors.extend(result[2])
+                        continue
+                    (directory, depth), (names, subdirs) = scanned, result
+                    for i in range(0, len(names), self.UNLINK_BATCH):
+                        running[pool.submit(unlink, directory, names[i:i + self.UNLINK_BATCH])] = None
+                    for subdir in subdirs:
+                        directories.setdefault(depth + 1, []).append(subdir)
+                        running[pool.submit(scan, subdir)] = (subdir, depth + 1)
+                now = time.perf_counter()
+                if progress and now - last_report >= self.PROGRESS_INTERVAL:
+                    progress(files_done, bytes_done, now - started); last_report = now
+
+            # Every file is gone; directories can go, deepest first (siblings in parallel)
+            for depth in sorted(directories, reverse=True):
+                errors.extend(e for e in pool.map(rmdir, directories[depth]) if e)
+        return files_done, bytes_done, errors
+
+    def discard(self, path):
+        """Moves a file or tree out of the way at once and deletes it in the background. Raises OSError on failure."""
+        import errno
+        os.makedirs(self.trash_dir, exist_ok=True)
+        trash_path = os.path.join(self.trash_dir, f"{os.getpid()}-{time.time_ns()}-{os.path.basename(path)}")
+        try:
+            os.rename(path, trash_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV: raise
+            _, _, errors = self.remove([path])  # Another filesystem; renaming would be a full copy
+            if errors: raise errors[0]
+            return
+        self._start_purge()
+
+    def resume(self):
+        """Starts deleting whatever an earlier run left in the trash (e.g. it exited mid-purge)."""
+        if os.path.isdir(self.trash_dir): self._start_purge()
+
+    def _start_purge(self):
+        with self._lock:
+            if self._purger is not None:
+                self._purge_again = True; return
+            self._purger = threading.Thread(target=self._purge, daemon=True)
+            self._purger.start()
+
+    def _purge(self):
+        """Background thread: empties the trash (including anything left there by an earlier run)."""
+        while True:
+            try: items = [os.path.join(self.trash_dir, name) for name in os.listdir(self.trash_dir)]
+            except OSError: items = []
+            if items: self.remove(items)  # Whatever fails stays in the trash for the next purge
+            with self._lock:
+                if not self._purge_again:
+                    self._purger = None; return
+                self._purge_again = False
+
+    def wait(self, timeout=None):
+        """Waits for background deletion to finish. Returns False if it is still running."""
+        purger = self._purger
+        if purger: purger.join(timeout)
+        return not (purger and purger.is_alive())
+
+
+class TreeCopier:
+    """
+    Copies files and directory trees. File data stays inside the kernel: a reflink
+    (FICLONE) where the filesystem can share blocks, otherwise copy_file_range or
+    sendfile, with a read/write loop as the last resort. Files are copied on a thread
+    pool, small ones in batches. Metadata is kept like shutil.copy2 (mode, timestamps).
+    """
+    SMALL_FILE = 1024 * 1024
+    SMALL_BATCH = 64
+    PROGRESS_INTERVAL = 0.2
+    FICLONE = 0x40049409  # _IOW(0x94, 9, int) from <linux/fs.h>
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+
+    def copy(self, source, destination, progress=None):
+        """
+        Copies a file or tree to destination (the new path itself, not its parent).
+        Calls progress(files, bytes, seconds) every PROGRESS_INTERVAL while it runs.
+        Returns (files, bytes, errors): errors don't stop the rest from being copied.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait
+        started = last_report = time.perf_counter()
+        totals, errors, lock = [0, 0], [], threading.Lock()
+
+        def copy_batch(pairs):
+            for src, dst in pairs:
+                try: size = self.copy_file(src, dst)
+                except OSError as e:
+                    with lock: errors.append(e)
+                    continue
+                with lock: totals[0] += 1; totals[1] += size
+
+        def report():
+            nonlocal last_report
+            now = time.perf_counter()
+            if progress and now - last_report >= self.PROGRESS_INTERVAL:
+                progress(totals[0], totals[1], now - started); last_report = now
+
+        if not os.path.isdir(source) or os.path.islink(source):
+            copy_batch([(source, destination)])
+            return totals[0], totals[1], errors
+
+        directories, pending, batch = [], [(source, destination)], []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = set()
+            while pending:
+                src_dir, dst_dir = pending.pop()
+                try:
+                    os.makedirs(dst_dir, exist_ok=True)
+                    with os.scandir(src_dir) as entries: entries = list(entries)
+                except OSError as e:
+                    errors.append(e); continue
+                directories.append((src_dir, dst_dir))
+                for entry in entries:
+                    target = os.path.join(dst_dir, entry.name)
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append((entry.path, target)); continue
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError as e:
+                        errors.append(e); continue
+                    if size >= self.SMALL_FILE:
+                        running.add(pool.submit(copy_batch, [(entry.path, target)]))
+                    else:
+                        batch.append((entry.path, target))
+                        if len(batch) >= self.SMALL_BATCH:
+                            running.add(pool.submit(copy_batch, batch)); batch = []
+                report()
+            if batch: running.add(pool.submit(copy_batch, batch))
+            while running:
+                _, running = wait(running, timeout=self.PROGRESS_INTERVAL)
+                report()
+
+        # Directory timestamps last, deepest first: creating their entries changed them
+        for src_dir, dst_dir in reversed(directories):
+            try: shutil.copystat(src_dir, dst_dir, follow_symlinks=False)
+            except OSError as e: errors.append(e)
+        return totals[0], totals[1], errors
+
+    def copy_file(self, source, destination):
+        """Copies one file (a symlink is recreated, not followed) with its metadata. Returns the bytes copied."""
+        import stat
+        source_stat = os.lstat(source)
+        if stat.S_ISLNK(source_stat.st_mode):
+            if os.path.lexists(destination): os.unlink(destination)
+            os.symlink(os.readlink(source), destination)
+            return 0
+        if not stat.S_ISREG(source_stat.st_mode):
+            raise OSError(f"Not a regular file, skipped: '{source}'")
+        with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+            self._copy_data(fsrc.fileno(), fdst.fileno())
+        shutil.copystat(source, destination)
+        return source_stat.st_size
+
+    def _copy_data(self, in_fd, out_fd):
+        import errno
+        try:
+            import fcntl
+            fcntl.ioctl(out_fd, self.FICLONE, in_fd)  # Shares the blocks: no data is copied at all
+            return
+        except (ImportError, OSError):
+            pass
+        unsupported = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF}
+        for name in ("copy_file_range", "sendfile"):
+            if not hasattr(os, name): continue
+            copied = 0
+            try:
+                while True:
+                    if name == "copy_file_range": n = os.copy_file_range(in_fd, out_fd, 1 << 30)
+                    else: n = os.sendfile(out_fd, in_fd, None, 1 << 30)
+                    if n == 0: break
+                    copied += n
+            except OSError as e:
+                if copied or e.errno not in unsupported: raise
+                continue
+            if copied or os.fstat(in_fd).st_size == 0: return
+            break  # Reports size 0 but may still have data (e.g. /proc files); read it instead
+        while True:
+            chunk = os.read(in_fd, 1024 * 1024)
+            if not chunk: return
+            view = memoryview(chunk)
+            while view: view = view[os.write(out_fd, view):]
+
+
+class SegmentedDownload:
+    """
+    Fetches one large file over several connections, each requesting its own byte range
+    and writing it with os.pwrite into a preallocated "<file>.part". How far every range
+    got is kept in a sidecar state file ("<file>.part.json"), so an interrupted transfer
+    resumes where each segment stopped, as long as the server still reports the same
+    size and validator (a strong ETag or Last-Modified, also sent as If-Range).
+    """
+    PROGRESS_INTERVAL = 0.2
+    STATE_INTERVAL = 1.0
+    CHUNK_SIZE = 256 * 1024
+    RETRIES = 3
+
+    def __init__(self, session, slots, url, filepath, size, validator, segments, fetch_url=None):
+        self.session, self.slots = session, slots
+        self.url, self.fetch_url = url, fetch_url or url
+        self.size, self.validator = size, validator
+        self.filepath = filepath
+        self.part_path = f"{filepath}.part"
+        self.state_path = f"{self.part_path}.json"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.ranges = self._load_state() or self._split(segments)  # [[start, end (exclusive), next byte], ...]
+        self.resumed = self.done()
+
+    def _split(self, segments):
+        step = -(-self.size // segments)
+        return [[start, min(start + step, self.size), start] for start in range(0, self.size, step)]
+
+    def _load_state(self):
+        """Returns the saved ranges if they belong to this same file, else None."""
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            if (state["url"], state["size"], state["validator"]) != (self.url, self.size, self.validator): return None
+            if os.path.getsize(self.part_path) != self.size: return None
+            return [[int(start), int(end), int(position)] for start, end, position in state["ranges"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_state(self):
+        with self._lock: ranges = [list(r) for r in self.ranges]
+        _write_json_atomic(self.state_path, {"url": self.url, "size": self.size, "validator": self.validator, "ranges": ranges})
+
+    def done(self):
+        with self._lock: return sum(position - start for start, _, position in self.ranges)
+
+    def run(self, progress=None):
+        """
+        Downloads the missing ranges, then renames the finished file into place.
+        Calls progress(done, total, transferred, seconds) every PROGRESS_INTERVAL; transferred
+        only counts this run. Raises on failure (and on KeyboardInterrupt) after saving the state.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+        fd = os.open(self.part_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                try: os.posix_fallocate(fd, 0, self.size)  # Reserve the space up front: no fragmented growth, no ENOSPC halfway
+                except (AttributeError, OSError): os.ftruncate(fd, self.size)
+            self._save_state()
+            started = last_state = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(self.ranges)) as pool:
+                try:
+                    running = {pool.submit(self._fetch_range, fd, r) for r in self.ranges if r[2] < r[1]}
+                    while running:
+                        finished, running = wait(running, timeout=self.PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                        for future in finished: future.result()  # Re-raises the first segment error
+                        now = time.perf_counter()
+                        if progress:
+                            done = self.done()
+                            progress(done, self.size, done - self.resumed, now - started)
+                        if now - last_state >= self.STATE_INTERVAL:
+                            self._save_state(); last_state = now
+                finally:
+                    self._stop.set()  # The other segments stop at their next chunk
+        finally:
+            os.close(fd)
+            if self.done() < self.size: self._save_state()
+        os.replace(self.part_path, self.filepath)
+        try: os.remove(self.state_path)
+        except OSError: pass
+
+    def _fetch_range(self, fd, byte_range):
+        """Downloads one range, reconnecting (from where it stopped) up to RETRIES times in a row without progress."""
+        import requests
+        failures, error = 0, None
+        while byte_range[2] < byte_range[1] and not self._stop.is_set():
+            position = byte_range[2]
+            headers = {"Range": f"bytes={position}-{byte_range[1] - 1}"}
+            if self.validator: headers["If-Range"] = self.validator
+            try:
+                with self.slots, self.session.get(self.fetch_url, headers=headers, stream=True, timeout=30) as resp:
+                    if resp.status_code != 206:
+                        raise ValueError(f"the server ignored the range request (HTTP {resp.status_code}); the file may have changed")
+                    for chunk in resp.iter_content(chunk_size=self.CHUNK_SIZE):
+                        if self._stop.is_set(): return
+                        view = memoryview(chunk)[:byte_range[1] - byte_range[2]]
+                        while view:
+                            written = os.pwrite(fd, view, byte_range[2])
+                            view = view[written:]
+                            with self._lock: byte_range[2] += written
+                        if byte_range[2] >= byte_range[1]: break
+            except requests.exceptions.RequestException as e:
+                error = e
+            failures = 0 if byte_range[2] > position else failures + 1
+            if failures > self.RETRIES: raise error or ConnectionError("the connection keeps closing early")
+            if failures: time.sleep(failures)
+
+
+class CommandTrie:
+    """
+    A prefix tree of command names for tab completion. Finding the completions of a
+    prefix costs the length of the prefix plus the number of matches, however many
+    commands exist. The "" key marks the end of a word.
+    """
+
+    def __init__(self, words=()):
+        self._root = {}
+        for word in words: self.add(word)
+
+    def add(self, word):
+        node = self._root
+        for ch in word: node = node.setdefault(ch, {})
+        node[""] = True
+
+    def remove(self, word):
+        path, node = [], self._root
+        for ch in word:
+            if ch not in node: return
+            path.append((node, ch)); node = node[ch]
+        node.pop("", None)
+        for parent, ch in reversed(path):  # Prune branches that no longer lead to a word
+            if parent[ch]: break
+            del parent[ch]
+
+    def __contains__(self, word):
+        node = self._root
+        for ch in word:
+            node = node.get(ch)
+            if node is None: return False
+        return "" in node
+
+    def complete(self, prefix):
+        """Returns every word starting with prefix, sorted."""
+        node = self._root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None: return []
+        words, stack = [], [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            for ch, child in node.items():
+                if ch == "": words.append(word)
+                else: stack.append((child, word + ch))
+        return sorted(words)
+
+
+class AppWorker:
+    """
+    A warm Python process for one app with `mode: inprocess` (or `mode: forkserver`).
+    The worker imports the app's dependencies once, then forks a child per call that
+    runs the script with runpy. Every call brings its own argv, cwd and stdio file
+    descriptors, and a crashing app only takes its own forked child down.
+    """
+
+    def __init__(self, script, preload):
+        import socket
+        self.script = script
+        self._control, worker_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        module_dir, module_name = os.path.split(os.path.splitext(os.path.abspath(__file__))[0])
+        bootstrap = (f"import sys; sys.path.insert(0, {module_dir!r}); import {module_name}; "
+                     f"{module_name}._app_worker_main(int(sys.argv[1]), sys.argv[2], sys.argv[3:])")
+        try:
+            self.process = subprocess.Popen([sys.executable, "-c", bootstrap, str(worker_end.fileno()), script, *preload],
+                                            pass_fds=[worker_end.fileno()], stdin=subprocess.DEVNULL)
+        finally:
+            worker_end.close()
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, argv, cwd, stdin_fd=0, stdout_fd=1, stderr_fd=2):
+        """Runs the script once and returns its exit code, or None if the forked child crashed."""
+        import socket
+        reply, child_reply = socket.socketpair()
+        try:
+            request = json.dumps({"argv": argv, "cwd": cwd}).encode()
+            socket.send_fds(self._control, [request], [stdin_fd, stdout_fd, stderr_fd, child_reply.fileno()])
+            child_reply.close()  # Only the forked child may hold it, so EOF means the child is gone
+            data = b""
+            while True:
+                chunk = reply.recv(64)
+                if not chunk: break
+                data += chunk
+            return int(data) if data.strip() else None
+        finally:
+            reply.close(); child_reply.close()
+
+    def close(self):
+        """Stops the worker. Children that are still running finish on their own."""
+        self._control.close()
+        try: self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired: self.process.kill()
+
+
+def _app_worker_main(control_fd, script, preload):
+    """Entry point of an AppWorker process: pre-imports modules, then forks one child per run request."""
+    import signal
+    import socket
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is meant for the running app, not the worker
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Finished children are reaped automatically
+
+    app_dir = os.path.dirname(script)
+    sys.path.insert(0, app_dir)
+    for module_name in list(preload) + _scan_top_level_imports(script, app_dir):
+        try: __import__(module_name)
+        except Exception: pass
+
+    control = socket.socket(fileno=control_fd)
+    while True:
+        try:
+            message, fds, _, _ = socket.recv_fds(control, 65536, 4)
+        except OSError:
+            break
+        if not message: break  # The shell closed its end
+        if len(fds) == 4 and os.fork() == 0:
+            control.close()
+            _app_worker_child(script, json.loads(message), fds)
+        for fd in fds: os.close(fd)
+    os._exit(0)
+
+
+def _scan_top_level_imports(script, app_dir):
+    """Returns the third-party/stdlib modules a script imports at top level (its own sibling modules excluded)."""
+    import ast
+    try:
+        with open(script, "rb") as f:
+            tree = ast.parse(f.read(), script)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import): names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level: names.append(node.module)
+    return [name for name in names if not (os.path.exists(os.path.join(app_dir, name.split(".")[0] + ".py"))
+                                           or os.path.isdir(os.path.join(app_dir, name.split(".")[0])))]
+
+
+def _app_worker_child(script, request, fds):
+    """Runs the app inside a forked worker child and reports its exit code. Never returns."""
+    import runpy
+    import signal
+    import socket
+    import traceback
+    code = 1
+    reply = socket.socket(fileno=fds[3])
+    try:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target_fd, fd in enumerate(fds[:3]):
+            os.dup2(fd, target_fd); os.close(fd)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+        sys.stderr = open(2, "w", buffering=1, closefd=False)
+        os.chdir(request["cwd"])
+        sys.argv = [script] + request["argv"]
+        runpy.run_path(script, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None: code = 0
+        elif isinstance(e.code, int): code = e.code
+        else: print(e.code, file=sys.stderr); code = 1
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        traceback.print_exc(); code = 1
+    finally:
+        try: sys.stdout.flush(); sys.stderr.flush()
+        except Exception: pass
+        try: reply.sendall(str(code).encode())
+        except OSError: pass
+        os._exit(code & 0xFF)
+
+
+def _grep_file(path, pattern, ignore_case, mode, mmap_bytes):
+    """
+    Searches one file for a regex; runs in 'grep' pool processes, so it only takes plain values.
+    mode is "lines", "count" or "list". Returns (path, match_count, [(line_number, text), ...]),
+    or None for binary or unreadable files. Files of mmap_bytes or more are mapped instead of read.
+    Like grep, matches never span lines: ^ and $ anchor at line boundaries.
+    """
+    import mmap
+    regex = re.compile(pattern.encode("utf-8", "surrogateescape"), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8192)
+            if b"\0" in head: return None  # Binary file
+            size = os.fstat(f.fileno()).st_size
+            if size <= len(head): data = head
+            elif size >= mmap_bytes: data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else: data = head + f.read()
+            try:
+                count, lines, line_number, counted_to, pos = 0, [], 1, 0, 0
+                while True:
+                    match = regex.search(data, pos)  # Whole-buffer search finds the next candidate line fast
+                    if not match: break
+                    start = data.rfind(b"\n", 0, match.start()) + 1
+                    if start >= len(data): break  # Past the final newline: not a line
+                    end = data.find(b"\n", match.start())
+                    if end == -1: end = len(data)
+                    if match.end() > end and not regex.search(data, start, end):
+                        # The match ran across a newline (\s, [^x]...): that line alone doesn't match
+                        if end >= len(data): break
+                        pos = end + 1; continue
+                    count += 1
+                    if mode == "list": break
+                    if mode == "lines":
+                        line_number += data[counted_to:start].count(b"\n"); counted_to = start  # mmap has no count()
+                        lines.append((line_number, data[start:end].rstrip(b"\r").decode("utf-8", "replace")))
+                    if end >= len(data): break
+                    pos = end + 1  # Each line counts once, however many matches it holds
+            finally:
+                if isinstance(data, mmap.mmap): data.close()
+    except (OSError, ValueError):
+        return None
+    return path, count, lines
+
+
+def _exchange_paths(first, second):
+    """
+    Atomically swaps two existing paths (renameat2 with RENAME_EXCHANGE), so neither name is ever missing.
+    Raises OSError, with ENOSYS/EINVAL where the C library, kernel or filesystem can't do it.
+    """
+    import ctypes
+    import errno
+    libc = ctypes.CDLL(None, use_errno=True)
+    if not hasattr(libc, "renameat2"): raise OSError(errno.ENOSYS, "renameat2 is not available")
+    AT_FDCWD, RENAME_EXCHANGE = -100, 2  # From <fcntl.h> and <linux/fs.h>
+    if libc.renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), first)
+
+
 class MyPythonOS:
     """
     A class that encapsulates the entire state and functionality of a simple,
@@ -36,9 +1064,14 @@ class MyPythonOS:
 
     # --- Core Class Setup & Constants ---
 
-    def __init__(self, library_mode=False):
-        """Initializes the OS, setting up paths, colors, and loading all configurations."""
+    def __init__(self, library_mode=False, startup_profile=False):
+        """
+        Initializes the OS, setting up paths, colors, and loading all configurations.
+        The repository is only parsed the first time it is used. With startup_profile,
+        a per-phase timing breakdown of the start-up is printed once initialization ends.
+        """
         self.library_mode = library_mode
+        self.startup_timings = [("module imports", _MODULE_LOADED_AT - _MODULE_STARTED_AT)]
         # ANSI escape codes for colors
         self.RED = '\033[91m'
         self.ORANGE = '\033[38;5;208m'
@@ -54,6 +1087,12 @@ class MyPythonOS:
         self.APPLICATIONS_DIR = os.path.join(self.ROOT_PATH, "applications")
         self.REPO_FILE = os.path.join(self.ROOT_PATH, "repo.txt")
         self.HISTORY_FILE = os.path.join(self.ROOT_PATH, ".mypythos_history")
+        self.CACHE_DIR = os.path.join(self.ROOT_PATH, ".mypythos_cache")
+        self.APP_INDEX_FILE = os.path.join(self.ROOT_PATH, ".mypythos_apps.json")
+        self.BUILD_CACHE_DIR = os.path.join(self.ROOT_PATH, ".mypythos_build")
+        self.TRASH_DIR = os.path.join(self.ROOT_PATH, ".mypythos_trash")
+        self.REPO_STATE_FILE = os.path.join(self.ROOT_PATH, ".mypythos_repo.json")  # Source URL, ETag, last check
+        self.TRACE_FILE = os.path.join(self.ROOT_PATH, ".mypythos_trace.jsonl")  # Written while tracing is on, read by 'stats'
         try:
             self.MAIN_SCRIPT = os.path.basename(__file__)
         except NameError:
@@ -62,41 +1101,238 @@ class MyPythonOS:
         # --- Constants ---
         self.DEFAULT_REPO_URL = "https://raw.githubusercontent.com/AxoIsAxo/null.os/refs/heads/main/repo.txt"
         self.HISTORY_MAX_LINES = 1000
+        self.COMPLETION_CACHE_TTL = 2.0  # Seconds a directory listing is reused by tab completion
+        self.COMPLETION_CACHE_DIRS = 64
+        self.APP_INDEX_VERSION = 1  # Bump whenever the fields stored per app index entry change
+        self.MAX_PARALLEL_DOWNLOADS = 6  # Upper bound on simultaneous HTTP requests
+        self.MAX_PARALLEL_INSTALLS = 4
+        self.DELETE_WORKERS = 8  # Threads unlinking files for deld, delpanic and uninstall
+        self.INSTALL_RECORD = ".install.json"  # Per app: where it was installed from, for 'upgrade'
+        self.STAGING_MAX_AGE = 24 * 3600  # Seconds before a leftover install staging dir counts as abandoned
+        self.COPY_WORKERS = 8  # Threads copying files for copy and cross-filesystem move
+        self.DOWNLOAD_SEGMENTS = 4  # Connections used by 'download' for one large file
+        self.SEGMENTED_MIN_BYTES = 8 * 1024 * 1024  # Smaller downloads use a single connection
+        self.DOWNLOADS_PER_HOST = 2  # 'download -i' never runs more transfers than this against one server
+        self.DOWNLOAD_RETRIES = 3
+        self.DOWNLOAD_BACKOFF = 1.0  # Seconds before the first retry; doubles each time
+        self.LS_FLUSH_LINES = 4096  # 'ls' writes its output in blocks of this many lines
+        self.GREP_MAX_FILE_BYTES = 256 * 1024 * 1024  # 'grep' skips larger files
+        self.GREP_MMAP_BYTES = 4 * 1024 * 1024  # Files at least this big are searched through mmap
+        self.GREP_PARALLEL_BYTES = 8 * 1024 * 1024  # Below this much data, a process pool costs more than it saves
+        self.CACHE_MAX_BYTES = 256 * 1024 * 1024
+        self.REPO_REFRESH_INTERVAL = 6 * 3600  # Seconds between background repository checks; user.json can override
 
         # --- System State ---
         self.username = "user"
         self.hostname = "mypythos"
         self.installed_apps = {}
-        self.app_repository = {}
+        self._app_index = None  # {app dir name: {"dir_mtime_ns", "conf_mtime_ns", "entry"}}, see _load_applications
+        self._app_repository = None  # Parsed from REPO_FILE on first access, see the app_repository property
+        self._repository_mtime_ns = None  # REPO_FILE's mtime when it was last parsed
+        self._repository_lock = threading.Lock()  # Serializes writers of REPO_FILE (refresh, repo add/remove)
+        self._repository_refresh_error = None  # Why the last background refresh failed, for 'repo status'
+        self.repo_url = self.DEFAULT_REPO_URL
+        self.repo_refresh_interval = self.REPO_REFRESH_INTERVAL
         self.running = True
+        self.cwd = self.ROOT_PATH  # This instance's working directory; the process-wide cwd is never changed
+        self.last_status = 0  # Exit status of the most recent command line, see _error()
+        self.exit_code = 0  # Set by 'exit [status]'
+        self.batch_mode = False  # Set by run_batch: commands may not prompt, see _ask()
+        self._streams = threading.local()  # Per-thread stdin/stdout used by pipeline stages
+        self.builtins = {}  # name -> bound cmd_ method, see _build_command_registry
+        self.aliases = {}  # name -> expansion, from "aliases" in user.json
+        self.command_trie = CommandTrie()  # Builtins, installed apps and aliases, for tab completion
+        self._completion_matches = []
+        self._listing_cache = {}  # directory -> (expires_at, sorted names, directory names), for path completion
+        self.trace_enabled = False  # 'trace on' or "trace": true in user.json
+        self._trace_stream = None  # (pid, file): reopened after a fork so daemon sessions don't share a buffer
+        self._trace_lock = threading.Lock()
+        self._http_session = None
+        self._session_lock = threading.Lock()
+        self._install_lock = threading.Lock()
+        self._download_slots = threading.BoundedSemaphore(self.MAX_PARALLEL_DOWNLOADS)
+        self._app_workers = {}  # command -> AppWorker for apps with `mode: inprocess`
+        self._worker_lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            import weakref
+            instance = weakref.ref(self)  # The hook must not keep a discarded instance alive
+            os.register_at_fork(after_in_child=lambda: instance() and instance()._reset_after_fork())
+        self.download_cache = DownloadCache(self.CACHE_DIR, self.CACHE_MAX_BYTES)
+        self.build_cache = BuildCache(self.BUILD_CACHE_DIR)
+        self.tree_remover = TreeRemover(self.TRASH_DIR, self.DELETE_WORKERS)
+        self.tree_copier = TreeCopier(self.COPY_WORKERS)
+        self._build_command_registry()
 
         # --- Start Initialization Sequence ---
         if not self.library_mode:
-            self._setup_readline()
+            self._timed("readline/history", self._setup_readline)
             self.cmd_clear()
             print("Welcome to MyPythonOS!")
 
-        self._initialize_filesystem()
-        self._load_user_config()
-        self._load_repository()
-        self._load_applications()
-
-        try:
-            os.chdir(self.ROOT_PATH)
-        except OSError as e:
-            if not self.library_mode:
-                print(f"{self.RED}Fatal: Could not change to root '{self.ROOT_PATH}': {e}{self.RESET}")
-            self.running = False
+        self._timed("filesystem", self._initialize_filesystem)
+        self._timed("user config", self._load_user_config)
+        self._timed("applications", self._load_applications)
+        self.tree_remover.resume()
+        if not self.library_mode:
+            if not os.path.exists(self.REPO_FILE):
+                print(f"Repository file '{os.path.basename(self.REPO_FILE)}' not found; fetching it in the background.")
+            self._start_repository_refresher()
         
         if not self.library_mode:
             print("-" * 30)
             print(f"Root directory: {self.ROOT_PATH}\nType 'help' for commands, 'exit' to quit.\nCommands can be chained with '|'.")
             print("-" * 30)
 
+        if startup_profile:
+            self.print_startup_profile()
+
+    def _reset_after_fork(self):
+        """
+        Runs in every forked child (daemon sessions, app workers). The parent's HTTP session holds
+        keep-alive sockets it goes on using, and its locks may have been held by a thread (e.g. the
+        repository refresher) that doesn't exist in the child, so the child starts with fresh ones.
+        """
+        self._http_session = None
+        self._session_lock = threading.Lock()
+        self._repository_lock = threading.Lock()
+        self._download_slots = threading.BoundedSemaphore(self.MAX_PARALLEL_DOWNLOADS)
+        self._install_lock = threading.Lock()
+        self._trace_lock = threading.Lock()
+
+    def _timed(self, phase, func):
+        """Runs one start-up phase and records how long it took in startup_timings."""
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.startup_timings.append((phase, time.perf_counter() - started))
+
+    def _trace(self, kind, name, started, **fields):
+        """
+        Appends one record (kind, name, seconds since the perf_counter value started, plus fields)
+        to TRACE_FILE when tracing is on. Each record is a single JSON line written in one call.
+        """
+        if not self.trace_enabled: return
+        record = {"time": round(time.time(), 3), "kind": kind, "name": name,
+                  "seconds": round(time.perf_counter() - started, 6), "pid": os.getpid(), **fields}
+        line = json.dumps(record) + "\n"
+        with self._trace_lock:
+            try:
+                if self._trace_stream is None or self._trace_stream[0] != os.getpid():
+                    self._trace_stream = (os.getpid(), open(self.TRACE_FILE, "a", encoding="utf-8"))
+                self._trace_stream[1].write(line)
+                self._trace_stream[1].flush()
+            except OSError:
+                pass  # Tracing must never break the command being traced
+
+    def _trace_download(self, url, started, ok, filepath, **fields):
+        """Records a _download_file transfer (by server) and returns ok, so it can wrap a return value."""
+        if self.trace_enabled:
+            from urllib.parse import urlparse
+            try: size = os.path.getsize(filepath) if ok else 0
+            except OSError: size = 0
+            self._trace("download", urlparse(url).netloc, started, url=url, ok=bool(ok), bytes=size, **fields)
+        return ok
+
+    def print_startup_profile(self):
+        """Prints the per-phase start-up timing breakdown."""
+        print(f"{self.YELLOW}--- Startup Profile ---{self.RESET}")
+        max_len = max(len(phase) for phase, _ in self.startup_timings)
+        for phase, seconds in self.startup_timings:
+            print(f"  {phase:<{max_len}} : {seconds * 1000:8.2f} ms")
+        print(f"  {'total':<{max_len}} : {sum(seconds for _, seconds in self.startup_timings) * 1000:8.2f} ms")
+
+    @property
+    def app_repository(self):
+        """The RepositoryIndex (name -> entry with installer URL and metadata), parsed from REPO_FILE on first access."""
+        if self._app_repository is None:
+            self._timed("repository (deferred)", self._load_repository)
+        return self._app_repository
+
+    # --- I/O Streams ---
+
+    @property
+    def stdout(self):
+        """The stream builtins write their output to (a pipe when running inside a pipeline)."""
+        return getattr(self._streams, "stdout", None) or sys.stdout
+
+    @property
+    def stdin(self):
+        """The stream builtins read piped input from (the terminal outside of a pipeline)."""
+        return getattr(self._streams, "stdin", None) or sys.stdin
+
+    def _piped_input(self):
+        """Returns all text piped into the current builtin, or None if nothing is piped in."""
+        stream = getattr(self._streams, "stdin", None)
+        return stream.read() if stream is not None else None
+
+    # --- Error Reporting ---
+
+    def _error(self, message, status=1):
+        """Reports a failed command: prints the message in red to stderr and records its exit status."""
+        sys.stdout.flush()  # stdout is block-buffered when redirected: what was printed before must come first
+        print(f"{self.RED}{message}{self.RESET}", file=sys.stderr)
+        self.last_status = status
+
+    def _usage(self, text):
+        """Reports a command called with bad arguments (exit status 2)."""
+        sys.stdout.flush()
+        print(text, file=sys.stderr)
+        self.last_status = 2
+
+    def _ask(self, prompt, refusal):
+        """
+        Reads a confirmation from the user. Returns the answer, or None (with status 1) if the input is closed
+        or interrupted, or if nobody can answer: in batch mode or without a terminal, refusal is reported instead.
+        """
+        if self.batch_mode or not sys.stdin.isatty():
+            self._error(f"Error: {refusal}"); return None
+        try:
+            return input(prompt).strip()
+        except (EOFError, KeyboardInterrupt):
+            print(); self.last_status = 1; return None
+
+    # --- Working Directory ---
+
+    def _resolve_path(self, path):
+        """Resolves a user-supplied path against this instance's cwd ('~' is the OS root)."""
+        if path == "~" or path.startswith("~/"):
+            return os.path.normpath(os.path.join(self.ROOT_PATH, path[2:]))
+        return os.path.normpath(os.path.join(self.cwd, path))
+
+    def _display_path(self, path):
+        """Shows an absolute path relative to this instance's cwd, the way the user would type it."""
+        return os.path.relpath(path, self.cwd)
+
+    def _critical_files(self):
+        """Absolute paths of the files no command may delete, move or overwrite."""
+        return [self.USER_CONFIG_FILE, self.REPO_FILE, os.path.join(self.ROOT_PATH, self.MAIN_SCRIPT)]
+
     # --- System Initialization and Loading ---
 
+    def _build_command_registry(self):
+        """Collects the builtin commands (every cmd_ method) once, at start-up. Their help text is read by 'help'."""
+        for attribute in sorted(dir(type(self))):
+            if not attribute.startswith("cmd_"): continue
+            name = attribute[len("cmd_"):]
+            self.builtins[name] = getattr(self, attribute)
+            self.command_trie.add(name)
+
+    @staticmethod
+    def _help_text(function):
+        """A function's docstring with the common indentation removed (what inspect.getdoc gives, without the import)."""
+        lines = (function.__doc__ or "").expandtabs().strip().splitlines()
+        if not lines: return "(No description available)"
+        indent = min((len(line) - len(line.lstrip()) for line in lines[1:] if line.strip()), default=0)
+        return "\n".join([lines[0]] + [line[indent:] for line in lines[1:]])
+
+    def _forget_command_name(self, name):
+        """Drops a name from the completion trie unless a builtin, app or alias still uses it."""
+        if name not in self.builtins and name not in self.installed_apps and name not in self.aliases:
+            self.command_trie.remove(name)
+
     def _setup_readline(self):
-        """Configures the readline library for command history."""
+        """Configures the readline library for command history and tab completion."""
         if readline is None:
             print(f"{self.YELLOW}Warning: readline not found. Command history and advanced line editing are disabled.{self.RESET}")
             print(f"{self.YELLOW}  On Windows, try: pip install pyreadline3{self.RESET}")
@@ -110,6 +1346,59 @@ class MyPythonOS:
                 readline.set_history_length(self.HISTORY_MAX_LINES)
         except Exception as e:
             print(f"{self.YELLOW}Warning: Could not load command history: {e}{self.RESET}")
+        if hasattr(readline, "set_completer"):
+            readline.set_completer(self._complete)
+            readline.set_completer_delims(" \t\n|;")  # Paths complete as one word, slashes included
+            if "libedit" in (getattr(readline, "__doc__", "") or ""): readline.parse_and_bind("bind ^I rl_complete")
+            else: readline.parse_and_bind("tab: complete")
+
+    def _complete(self, text, state):
+        """readline completer: command names at the start of a command, paths everywhere else."""
+        if state == 0:
+            try:
+                line = readline.get_line_buffer()[:readline.get_begidx()]
+                if not re.split(r"[|;]", line)[-1].strip():
+                    self._completion_matches = [f"{name} " for name in self.command_trie.complete(text)]
+                else:
+                    self._completion_matches = self._complete_path(text)
+            except Exception:
+                self._completion_matches = []  # readline swallows errors silently; never break the prompt
+        return self._completion_matches[state] if state < len(self._completion_matches) else None
+
+    def _complete_path(self, text):
+        """Completes a (possibly ~/ or relative) path; directories get a trailing slash."""
+        import bisect
+        head, sep, prefix = text.rpartition("/")
+        names, dirs = self._cached_listing(self._resolve_path((head or "/") if sep else "."))
+        matches = []
+        for name in names[bisect.bisect_left(names, prefix):]:  # Sorted names: the matches are one contiguous run
+            if not name.startswith(prefix): break
+            if name.startswith(".") and not prefix: continue  # Hidden entries only when asked for
+            matches.append(f"{head}{sep}{name}{'/' if name in dirs else ''}")
+        return matches
+
+    def _cached_listing(self, directory):
+        """Returns (sorted names, set of directory names) for directory, reusing listings younger than COMPLETION_CACHE_TTL."""
+        now = time.monotonic()
+        cached = self._listing_cache.get(directory)
+        if cached and cached[0] > now: return cached[1], cached[2]
+        names, dirs = [], set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    names.append(entry.name)
+                    try:
+                        if entry.is_dir(): dirs.add(entry.name)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        names.sort()
+        if len(self._listing_cache) >= self.COMPLETION_CACHE_DIRS:
+            for key in [key for key, value in self._listing_cache.items() if value[0] <= now] or list(self._listing_cache)[:1]:
+                del self._listing_cache[key]
+        self._listing_cache[directory] = (now + self.COMPLETION_CACHE_TTL, names, dirs)
+        return names, dirs
 
     def _initialize_filesystem(self):
         """Ensures that essential directories like 'applications' exist."""
@@ -128,6 +1417,13 @@ class MyPythonOS:
                     config = json.load(f)
                 self.username = config.get("username", "user")
                 self.hostname = config.get("hostname", "hostname")
+                self.repo_url = config.get("repo_url", self.DEFAULT_REPO_URL)
+                if not isinstance(self.repo_url, str) or not self.repo_url.strip():
+                    self._config_warning("'repo_url' must be a URL string")
+                    self.repo_url = self.DEFAULT_REPO_URL
+                self.repo_refresh_interval = self._parse_refresh_interval(config.get("repo_refresh_interval", self.REPO_REFRESH_INTERVAL))
+                self._set_aliases(config.get("aliases", {}))
+                self.trace_enabled = bool(config.get("trace", False))
             except json.JSONDecodeError:
                 if not self.library_mode:
                     print(f"{self.YELLOW}Warning: Could not decode user.json. Using defaults.{self.RESET}")
@@ -138,6 +1434,34 @@ class MyPythonOS:
         if not self.library_mode:
             print("-" * 30)
 
+    def _config_warning(self, problem):
+        if not self.library_mode:
+            print(f"{self.YELLOW}Warning: {problem} in user.json. Using the default.{self.RESET}")
+
+    def _parse_refresh_interval(self, value):
+        """Validates "repo_refresh_interval" (seconds; 0 or less turns refreshing off)."""
+        import math
+        try:
+            interval = float(value)
+            if not math.isfinite(interval) or isinstance(value, bool): raise ValueError(value)
+        except (TypeError, ValueError):
+            self._config_warning("'repo_refresh_interval' must be a number of seconds")
+            return self.REPO_REFRESH_INTERVAL
+        return interval
+
+    def _set_aliases(self, aliases):
+        """Installs the "aliases" map from user.json ({"ll": "ls -l"}) and adds the names to completion."""
+        for name in list(self.aliases):
+            del self.aliases[name]
+            self._forget_command_name(name)
+        if not isinstance(aliases, dict):
+            if not self.library_mode: print(f"{self.YELLOW}Warning: 'aliases' in user.json must be an object. Ignored.{self.RESET}")
+            return
+        for name, expansion in aliases.items():
+            if not isinstance(expansion, str) or not name.strip() or any(c.isspace() or c in "|;" for c in name): continue
+            self.aliases[name.lower()] = expansion
+            self.command_trie.add(name.lower())
+
     def _create_user_config(self):
         """Prompts for and saves a new user configuration."""
         if self.library_mode:
@@ -158,203 +1482,625 @@ class MyPythonOS:
                 print(f"{self.RED}Error: Could not create user.json: {e}{self.RESET}")
             self.username, self.hostname = "user", "mypythos"
 
-    def _load_repository(self):
-        """Loads the application repository from repo.txt, downloading it if necessary."""
-        self.app_repository.clear()
-        if not os.path.exists(self.REPO_FILE) and not self.library_mode:
-            print(f"Repository file '{os.path.basename(self.REPO_FILE)}' not found.")
+    def _start_repository_refresher(self):
+        """Starts the background thread that keeps REPO_FILE current (see _refresh_repository)."""
+        if self.repo_refresh_interval <= 0 and os.path.exists(self.REPO_FILE): return
+        threading.Thread(target=self._repository_refresh_loop, daemon=True).start()
+
+    def _repository_refresh_loop(self):
+        """Background thread: refreshes the repository every repo_refresh_interval seconds (retrying sooner after errors)."""
+        interval = self.repo_refresh_interval
+        if os.path.exists(self.REPO_FILE):
+            delay = max(0.0, self._load_repository_state().get("checked_at", 0) + interval - time.time())
+        else:
+            delay = 0.0
+        while True:
+            time.sleep(delay)
             try:
-                download_repo = input(f"Download initial repository from default URL? (Y/n): ").lower()
-            except (EOFError, KeyboardInterrupt):
-                print("\nSkipping repository download.")
-                return
-            if download_repo in ["", "y"]:
-                print("Attempting to download initial repository...")
-                if self._download_file(self.DEFAULT_REPO_URL, self.REPO_FILE):
-                    print(f"{self.GREEN}Successfully downloaded initial repository.{self.RESET}")
-                else:
-                    print(f"{self.YELLOW}Warning: Failed to download repository.{self.RESET}")
-            else:
-                print("Skipping repository download. Use 'repo update' later.")
-        
+                self._refresh_repository()
+                self._repository_refresh_error, delay = None, interval
+            except Exception as e:
+                self._repository_refresh_error, delay = str(e) or type(e).__name__, min(interval, 300)
+            if interval <= 0: return
+
+    def _refresh_repository(self, url=None, force=False):
+        """
+        Fetches the repository with a conditional GET (ETag / Last-Modified) and, if it changed,
+        writes REPO_FILE and swaps the new index in as a whole. Local edits ('repo add/remove')
+        are only replaced when force is set. Returns True if a new version was installed.
+        Raises on network errors or a malformed repository, leaving the last good copy in place.
+        """
+        state = self._load_repository_state()
+        url = url or self.repo_url  # user.json decides the source; 'repo update <url>' overrides it once
+        try: local_mtime_ns = os.stat(self.REPO_FILE).st_mtime_ns
+        except OSError: local_mtime_ns = None
+        if local_mtime_ns is not None and state.get("mtime_ns") is None:
+            # A repo.txt from before refreshes were tracked may hold 'repo add' entries: it counts as
+            # locally edited, so only 'repo update' replaces it
+            state.update(mtime_ns=local_mtime_ns, checked_at=time.time(), untracked=True)
+            self._save_repository_state(state)
+        edited_locally = self._repository_edited_locally(state, local_mtime_ns)
+        if edited_locally and not force: return False
+
+        headers = {}
+        if url == state.get("url") and local_mtime_ns is not None and not edited_locally:
+            if state.get("etag"): headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"): headers["If-Modified-Since"] = state["last_modified"]
+        with self._download_slots:
+            resp = self._get_http_session().get(url, headers=headers, timeout=20, allow_redirects=True)
+        with resp:
+            if resp.status_code == 304:
+                state.update(url=url, checked_at=time.time())
+                self._save_repository_state(state)
+                return False
+            resp.raise_for_status()
+            repository, _ = RepositoryIndex.parse(resp.text)
+        if not repository: raise ValueError("the downloaded repository is empty")
+
+        with self._repository_lock:
+            _write_atomic(self.REPO_FILE, resp.text)
+            self._repository_mtime_ns = os.stat(self.REPO_FILE).st_mtime_ns
+            self._app_repository = repository  # One assignment: readers see the old index or the new one
+            state.update(url=url, checked_at=time.time(), etag=resp.headers.get("ETag"),
+                         last_modified=resp.headers.get("Last-Modified"), mtime_ns=self._repository_mtime_ns)
+            state.pop("untracked", None)
+            self._save_repository_state(state)
+        return True
+
+    @staticmethod
+    def _repository_edited_locally(state, local_mtime_ns):
+        """Whether REPO_FILE differs from the last fetched copy (or was never fetched by the refresher)."""
+        if local_mtime_ns is None: return False
+        return state.get("untracked", False) or state.get("mtime_ns") not in (None, local_mtime_ns)
+
+    def _load_repository_state(self):
+        try:
+            with open(self.REPO_STATE_FILE, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_repository_state(self, state):
+        try:
+            _write_json_atomic(self.REPO_STATE_FILE, state)
+        except OSError:
+            pass  # Only costs a full download next time
+
+    def _load_repository(self):
+        """Loads the application repository from repo.txt (either the JSON index or name/URL lines)."""
         if not os.path.exists(self.REPO_FILE):
+            self._app_repository = RepositoryIndex()
             return
         
         try:
-            with open(self.REPO_FILE, "r") as f:
-                lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-            if len(lines) % 2 != 0:
-                if not self.library_mode: print(f"{self.YELLOW}Warning: Malformed repo file. Ignoring last.{self.RESET}")
-                lines = lines[:-1]
-            
-            for i in range(0, len(lines), 2):
-                name, url = lines[i], lines[i+1]
-                if name and url: self.app_repository[name] = url
+            self._repository_mtime_ns = os.stat(self.REPO_FILE).st_mtime_ns
+            with open(self.REPO_FILE, "r", encoding="utf-8") as f:
+                repository, problems = RepositoryIndex.parse(f.read())
+            if not self.library_mode:
+                for problem in problems: print(f"{self.YELLOW}Warning: {problem}{self.RESET}")
+            self._app_repository = repository  # Swapped in whole, never modified half-loaded
             
-            if self.app_repository and not self.library_mode:
-                print(f"{self.GREEN}Loaded {len(self.app_repository)} entries from repository.{self.RESET}")
-        except OSError as e:
+            if repository and not self.library_mode:
+                print(f"{self.GREEN}Loaded {len(repository)} entries from repository.{self.RESET}")
+        except (OSError, ValueError) as e:
+            if self._app_repository is None: self._app_repository = RepositoryIndex()
             if not self.library_mode: print(f"{self.RED}Error reading repository file: {e}{self.RESET}")
 
     def _load_applications(self):
-        """Scans the applications directory and loads all valid installed apps."""
+        """
+        Registers all installed apps, using the persisted app index to skip
+        re-parsing any app whose directory and app.conf haven't changed.
+        """
+        commands = list(self.installed_apps)
         self.installed_apps.clear()
+        for command in commands: self._forget_command_name(command)
         if not os.path.isdir(self.APPLICATIONS_DIR):
             return
 
+        index = self._get_app_index()
+        fresh_index, changed = {}, False
         app_count = 0
-        for item_name in os.listdir(self.APPLICATIONS_DIR):
-            app_dir = os.path.join(self.APPLICATIONS_DIR, item_name)
-            if os.path.isdir(app_dir):
-                if os.path.isfile(os.path.join(app_dir, "app.conf")):
-                    if self._setup_app(app_dir):
-                        app_count += 1
+        with os.scandir(self.APPLICATIONS_DIR) as entries:
+            for item in entries:
+                # Hidden directories are install staging areas, never apps.
+                if item.name.startswith(".") or not item.is_dir():
+                    self._discard_stale_staging(item)
+                    continue
+                try:
+                    dir_mtime = item.stat().st_mtime_ns
+                    conf_mtime = os.stat(os.path.join(item.path, "app.conf")).st_mtime_ns
+                except OSError:
+                    continue
+
+                cached = index.get(item.name)
+                if cached and cached.get("dir_mtime_ns") == dir_mtime and cached.get("conf_mtime_ns") == conf_mtime:
+                    entry = cached.get("entry")
+                else:
+                    entry = self._read_app_entry(item.path)
+                    changed = True
+                fresh_index[item.name] = {"dir_mtime_ns": dir_mtime, "conf_mtime_ns": conf_mtime, "entry": entry}
+                if entry and self._register_app(item.path, entry):
+                    app_count += 1
+
+        if changed or fresh_index.keys() != index.keys():
+            self._app_index = fresh_index
+            self._save_app_index()
         
         if app_count > 0 and not self.library_mode:
             print(f"{self.GREEN}Loaded {app_count} applications.{self.RESET}")
 
-    def _setup_app(self, app_dir):
-        """Reads an app.conf file and registers the application if valid."""
-        conf_file = os.path.join(app_dir, "app.conf")
-        app_dir_rel = os.path.relpath(app_dir, self.APPLICATIONS_DIR)
+    def _discard_stale_staging(self, item):
+        """Deletes (in the background) a staging directory left behind by an install that crashed."""
         try:
-            with open(conf_file, "r", encoding='utf-8') as f:
-                content = f.read()
-            conf_data = self._parse_app_conf_content(content)
-
-            if not conf_data: return False
-
-            name = conf_data.get("name")
-            command = conf_data.get("command", name)
-            version = conf_data.get("version", "N/A")
-            file_to_run = conf_data.get("file")
-
-            if not all([name, command, file_to_run]): return False
+            if item.name.startswith(".") and item.is_dir(follow_symlinks=False) and \
+                    time.time() - item.stat(follow_symlinks=False).st_mtime > self.STAGING_MAX_AGE:
+                self.tree_remover.discard(item.path)
+        except OSError:
+            pass
 
-            script_path = os.path.join(app_dir, file_to_run)
-            if not os.path.isfile(script_path): return False
-            
-            if hasattr(self, f"cmd_{command}") or command in self.installed_apps: return False
-            
-            self.installed_apps[command] = {"name": name, "script": script_path, "version": version, "app_dir": app_dir}
-            return True
+    def _setup_app(self, app_dir):
+        """Reads a single app's app.conf, updates its app index entry and registers the application if valid."""
+        entry = self._read_app_entry(app_dir)
+        try:
+            self._get_app_index()[os.path.basename(app_dir)] = {
+                "dir_mtime_ns": os.stat(app_dir).st_mtime_ns,
+                "conf_mtime_ns": os.stat(os.path.join(app_dir, "app.conf")).st_mtime_ns,
+                "entry": entry,
+            }
+            self._save_app_index()
+        except OSError:
+            pass
+        return bool(entry) and self._register_app(app_dir, entry)
+
+    def _forget_app(self, command):
+        """Unregisters an installed app and drops its app index entry."""
+        app_info = self.installed_apps.pop(command, None)
+        self._forget_command_name(command)
+        with self._worker_lock: worker = self._app_workers.pop(command, None)
+        if worker: worker.close()
+        if app_info and self._get_app_index().pop(os.path.basename(app_info["app_dir"]), None) is not None:
+            self._save_app_index()
+
+    def _read_app_entry(self, app_dir):
+        """Parses an app's app.conf into an index entry, or returns None if the app is invalid."""
+        try:
+            with open(os.path.join(app_dir, "app.conf"), "r", encoding='utf-8') as f:
+                conf_data = self._parse_app_conf_content(f.read())
         except Exception:
-            return False
+            return None
+
+        name = conf_data.get("name")
+        command = conf_data.get("command", name)
+        file_to_run = conf_data.get("file")
+        if not all([name, command, file_to_run]): return None
+        if not os.path.isfile(os.path.join(app_dir, file_to_run)): return None
+        preload = [m.strip() for m in conf_data.get("preload", "").split(",") if m.strip()]
+        return {"name": name, "command": command, "version": conf_data.get("version", "N/A"), "file": file_to_run,
+                "mode": conf_data.get("mode", "subprocess").lower(), "preload": preload}
+
+    def _register_app(self, app_dir, entry):
+        """Adds an app index entry to installed_apps unless its command clashes with an existing one."""
+        command = entry["command"]
+        if command in self.builtins or command in self.installed_apps: return False
+        self.installed_apps[command] = {"name": entry["name"], "script": os.path.join(app_dir, entry["file"]),
+                                        "version": entry["version"], "app_dir": app_dir,
+                                        "mode": entry["mode"], "preload": entry["preload"]}
+        self.command_trie.add(command)
+        return True
+
+    def _get_app_index(self):
+        """Returns the in-memory app index, reading it from APP_INDEX_FILE on first use."""
+        if self._app_index is None:
+            try:
+                with open(self.APP_INDEX_FILE, "r") as f:
+                    index = json.load(f)
+                valid = isinstance(index, dict) and index.get("version") == self.APP_INDEX_VERSION
+                self._app_index = index.get("apps", {}) if valid else {}
+            except (OSError, ValueError):
+                self._app_index = {}
+        return self._app_index
+
+    def _save_app_index(self):
+        """Atomically writes the app index to APP_INDEX_FILE."""
+        try:
+            _write_json_atomic(self.APP_INDEX_FILE, {"version": self.APP_INDEX_VERSION, "apps": self._app_index})
+        except OSError as e:
+            if not self.library_mode: print(f"{self.YELLOW}Warning: Could not save app index: {e}{self.RESET}")
 
     # --- Command Implementations: File System ---
 
     def cmd_ls(self, args=None):
-        """(ls) Lists files and directories. Use 'ls -l' for detailed view."""
+        """(ls) Lists files and directories. -l detailed, -h human sizes, -R recurse, -S/-t sort by size/time, -r reverse, -U unsorted."""
         if args is None: args = []
+        flags, paths = set(), []
+        for arg in args:
+            if arg.startswith("-") and len(arg) > 1: flags.update(arg[1:])
+            else: paths.append(arg)
+        unknown = flags - set("lhRStrU")
+        if unknown: self._usage(f"Usage: ls [-lhRStrU] [directory]  (unknown flag '-{sorted(unknown)[0]}')"); return
+        if len(paths) > 1: self._usage("Usage: ls [-lhRStrU] [directory]"); return
+
+        target_dir = self._resolve_path(paths[0]) if paths else self.cwd
+        if not os.path.isdir(target_dir): self._error("Error: Directory not found."); return
+        out = self.stdout
+        lines = []
+
+        def emit(line):
+            lines.append(line)
+            if len(lines) >= self.LS_FLUSH_LINES:
+                out.write("\n".join(lines) + "\n"); lines.clear()
+
+        pending = [target_dir]
+        while pending:
+            directory = pending.pop()
+            if "R" in flags:
+                if directory != target_dir: emit("")
+                emit(f"{self._display_path(directory) if directory != self.cwd else '.'}:")
+            try:
+                subdirs = self._list_directory(directory, flags, emit)
+            except OSError as e:
+                self._error(f"Error listing directory: {e}"); continue
+            if "R" in flags: pending.extend(reversed(subdirs))
+        if lines: out.write("\n".join(lines) + "\n")
+
+    def _list_directory(self, directory, flags, emit):
+        """
+        Emits one line per entry of a directory through emit(), using the d_type and
+        stat data os.scandir already has. Returns the subdirectories, in display order.
+        """
+        detailed, by_size, by_time = "l" in flags, "S" in flags, "t" in flags
+        need_stat = detailed or by_size or by_time
+        subdirs, minutes = [], {}
+
+        def describe(entry):
+            try: is_dir = entry.is_dir()
+            except OSError: is_dir = False
+            stat_info = None
+            if need_stat:
+                try: stat_info = entry.stat()
+                except OSError:
+                    try: stat_info = entry.stat(follow_symlinks=False)
+                    except OSError: self._error(f"Error reading: {entry.name}")
+            return entry, is_dir, stat_info
+
+        def render(entry, is_dir, stat_info):
+            if is_dir and "R" in flags and not entry.is_symlink(): subdirs.append(entry.path)
+            if detailed:
+                if stat_info is None: return
+                size = self._format_size(stat_info.st_size) if "h" in flags else stat_info.st_size
+                minute = int(stat_info.st_mtime // 60)
+                mtime = minutes.get(minute)
+                if mtime is None:  # Formatting is the slow part of a long listing; most entries share a minute
+                    mtime = minutes[minute] = time.strftime("%Y-%m-%d %H:%M", time.localtime(minute * 60))
+                if is_dir: emit(f"{self.BLUE}d {size:>10} {mtime} {entry.name}/{self.RESET}")
+                else: emit(f"- {size:>10} {mtime} {entry.name}{self.RESET}")
+            elif is_dir: emit(f"{self.BLUE}{entry.name}{self.RESET}/")
+            else:
+                try: is_file = entry.is_file()
+                except OSError: is_file = False
+                emit(entry.name if is_file else f"{self.ORANGE}{entry.name}{self.RESET}")
+
+        with os.scandir(directory) as entries:
+            if "U" in flags:
+                # Unsorted: each entry is written as soon as the kernel returns it
+                for entry in entries: render(*describe(entry))
+                return subdirs
+            described = [describe(entry) for entry in entries]
+
+        if by_size: key = lambda item: (-(item[2].st_size if item[2] else 0), item[0].name)
+        elif by_time: key = lambda item: (-(item[2].st_mtime_ns if item[2] else 0), item[0].name)
+        else: key = lambda item: item[0].name
+        described.sort(key=key, reverse="r" in flags)
+        for item in described: render(*item)
+        return subdirs
+
+    def _walk_entries(self, top):
+        """Yields (DirEntry, depth) for everything below a directory, depth-first; symlinked directories are not followed."""
+        pending = [(top, 1)]
+        while pending:
+            directory, depth = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        yield entry, depth
+                        try:
+                            if entry.is_dir(follow_symlinks=False): pending.append((entry.path, depth + 1))
+                        except OSError: pass
+            except OSError as e:
+                self._error(f"Error reading '{self._display_path(directory)}': {e.strerror}")
+
+    @staticmethod
+    def _parse_size_filter(value):
+        """Parses a find -size value like '+10M', '-4K' or '512' into (sign, bytes)."""
+        sign = value[0] if value[:1] in ("+", "-") else ""
+        number = value[len(sign):]
+        multiplier = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(number[-1:].upper(), 1)
+        if multiplier != 1: number = number[:-1]
+        return sign, float(number) * multiplier
+
+    def cmd_find(self, args):
+        """(find) Finds files below a directory by name glob, size, age in days or type."""
+        import fnmatch
+        usage = "Usage: find [dir] [-name GLOB] [-size [+-]N[KMG]] [-mtime [+-]DAYS] [-type f|d]"
+        top = "."
+        if args and not args[0].startswith("-"): top, args = args[0], args[1:]
+        if len(args) % 2: self._usage(usage); return
+        filters = dict(zip(args[::2], args[1::2]))
+        if set(filters) - {"-name", "-size", "-mtime", "-type"} or filters.get("-type", "f") not in ("f", "d"):
+            self._usage(usage); return
         try:
-            detailed = "-l" in args
-            target_dir = os.getcwd()
-            items = sorted(os.listdir(target_dir))
-            for item in items:
-                try:
-                    item_path = os.path.join(target_dir, item)
-                    if detailed:
-                        stat_info = os.stat(item_path)
-                        size = stat_info.st_size
-                        if os.path.isdir(item_path): print(f"{self.BLUE}d {size:>10} {item}/{self.RESET}")
-                        else: print(f"- {size:>10} {item}{self.RESET}")
-                    else:
-                        if os.path.isdir(item_path): print(f"{self.BLUE}{item}{self.RESET}/")
-                        elif os.path.isfile(item_path): print(item)
-                        else: print(f"{self.ORANGE}{item}{self.RESET}")
-                except OSError: print(f"{self.RED}Error reading: {item}{self.RESET}")
-        except FileNotFoundError: print(f"{self.RED}Error: Directory not found.{self.RESET}")
-        except OSError as e: print(f"{self.RED}Error listing directory: {e}{self.RESET}")
+            size_filter = self._parse_size_filter(filters["-size"]) if "-size" in filters else None
+            mtime = filters.get("-mtime")
+            mtime_filter = (mtime[0] if mtime[0] in "+-" else "", int(mtime.lstrip("+-"))) if mtime else None
+        except (ValueError, IndexError):
+            self._usage(usage); return
+
+        root = self._resolve_path(top)
+        if not os.path.isdir(root): self._error(f"Error: Directory not found: {top}"); return
+        name_glob, wanted_type, now = filters.get("-name"), filters.get("-type"), time.time()
+        out, lines = self.stdout, []
+
+        def matches_range(sign, limit, value):
+            return value > limit if sign == "+" else value < limit if sign == "-" else value == limit
+
+        for entry, _ in self._walk_entries(root):
+            if name_glob and not fnmatch.fnmatchcase(entry.name, name_glob): continue
+            try:
+                if wanted_type and entry.is_dir(follow_symlinks=False) != (wanted_type == "d"): continue
+                if size_filter or mtime_filter:
+                    stat_info = entry.stat(follow_symlinks=False)
+                    if size_filter and not matches_range(*size_filter, stat_info.st_size): continue
+                    if mtime_filter and not matches_range(*mtime_filter, int((now - stat_info.st_mtime) // 86400)): continue
+            except OSError:
+                continue
+            lines.append(os.path.join(top, os.path.relpath(entry.path, root)))
+            if len(lines) >= self.LS_FLUSH_LINES:
+                out.write("\n".join(lines) + "\n"); lines.clear()
+        if lines: out.write("\n".join(lines) + "\n")
+
+    def cmd_grep(self, args):
+        """(grep) Searches files or piped input for a regex. -r recurse, -l file names only, -c counts, -i ignore case, -n line numbers."""
+        usage = "Usage: grep [-rlcin] <pattern> [path...]"
+        flags, rest = set(), list(args)
+        while rest and rest[0].startswith("-") and len(rest[0]) > 1:
+            if rest[0] == "--": rest.pop(0); break
+            flags.update(rest.pop(0)[1:])
+        if not rest or flags - set("rlcin"): self._usage(usage); return
+        pattern, paths = rest[0], rest[1:]
+        try:
+            regex = re.compile(pattern, re.IGNORECASE if "i" in flags else 0)
+        except re.error as e:
+            self._error(f"Error: Invalid pattern: {e}", status=2); return
+        mode = "list" if "l" in flags else "count" if "c" in flags else "lines"
+        out = self.stdout
+
+        if not paths:
+            text = self._piped_input()
+            if text is None: self._usage(usage); return
+            matched = [(n, line) for n, line in enumerate(text.splitlines(), 1) if regex.search(line)]
+            if mode == "count": print(len(matched), file=out)
+            elif mode == "lines" and matched:
+                out.write("".join(f"{n}:{line}\n" if "n" in flags else f"{line}\n" for n, line in matched))
+            if not matched: self.last_status = 1
+            return
+
+        files, status = [], 0
+        for path in paths:
+            resolved = self._resolve_path(path)
+            if os.path.isdir(resolved):
+                if "r" not in flags: self._error(f"Error: '{path}' is a directory.", status=2); status = 2; continue
+                for entry, _ in self._walk_entries(resolved):
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            size = entry.stat(follow_symlinks=False).st_size
+                            if size <= self.GREP_MAX_FILE_BYTES:
+                                files.append((entry.path, os.path.join(path, os.path.relpath(entry.path, resolved)), size))
+                    except OSError: pass
+            elif os.path.isfile(resolved):
+                files.append((resolved, path, os.path.getsize(resolved)))
+            else:
+                self._error(f"Error: File not found: {path}", status=2); status = 2
+
+        show_names = len(paths) > 1 or "r" in flags
+        search_args = (pattern, "i" in flags, mode, self.GREP_MMAP_BYTES)
+        found = False
+        for result, (_, display, _) in zip(self._search_files([f[0] for f in files], search_args,
+                                                              sum(f[2] for f in files)), files):
+            if result is None: continue
+            _, count, lines = result
+            found = found or count > 0
+            prefix = f"{self.ORANGE}{display}{self.RESET}:" if show_names else ""
+            if mode == "list":
+                if count: print(display, file=out)
+            elif mode == "count":
+                print(f"{prefix}{count}", file=out)
+            elif lines:
+                out.write("".join(f"{prefix}{n}:{line}\n" if "n" in flags else f"{prefix}{line}\n" for n, line in lines))
+        self.last_status = status or (0 if found else 1)
+
+    def _search_files(self, paths, search_args, total_bytes):
+        """Runs _grep_file over many files, in a process pool when there is enough data. Yields results in order."""
+        if len(paths) < 2 or total_bytes < self.GREP_PARALLEL_BYTES:
+            for path in paths: yield _grep_file(path, *search_args)
+            return
+        import itertools
+        from concurrent.futures import ProcessPoolExecutor
+        workers = min(os.cpu_count() or 1, len(paths))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_grep_file, paths, *map(itertools.repeat, search_args),
+                                chunksize=max(1, len(paths) // (workers * 8)))
 
     def cmd_cd(self, args):
         """(cd) Changes the current directory. 'cd ~' or 'cd' goes to root."""
         target_dir = args[0] if args and args[0] != "~" else self.ROOT_PATH
-        try:
-            os.chdir(target_dir)
-        except FileNotFoundError: print(f"{self.RED}Error: Directory not found: {target_dir}{self.RESET}")
-        except NotADirectoryError: print(f"{self.RED}Error: Not a directory: {target_dir}{self.RESET}")
-        except OSError as e: print(f"{self.RED}Error changing directory: {e}{self.RESET}")
+        path = self._resolve_path(target_dir)
+        if not os.path.exists(path): self._error(f"Error: Directory not found: {target_dir}")
+        elif not os.path.isdir(path): self._error(f"Error: Not a directory: {target_dir}")
+        elif not os.access(path, os.X_OK): self._error(f"Error changing directory: Permission denied: {target_dir}")
+        else: self.cwd = path
 
     def cmd_pwd(self, args=None):
         """(pwd) Prints the current working directory path."""
-        try:
-            cwd_abs = os.path.abspath(os.getcwd())
-            root_abs = os.path.abspath(self.ROOT_PATH)
-            if cwd_abs == root_abs:
-                print("~")
-            elif cwd_abs.startswith(root_abs + os.sep):
-                print(f"~/{os.path.relpath(cwd_abs, root_abs).replace(os.sep, '/')}")
-            else:
-                print(cwd_abs)
-        except OSError as e: print(f"{self.RED}Error getting current directory: {e}{self.RESET}")
+        cwd_abs = self.cwd
+        root_abs = os.path.abspath(self.ROOT_PATH)
+        if cwd_abs == root_abs:
+            print("~", file=self.stdout)
+        elif cwd_abs.startswith(root_abs + os.sep):
+            print(f"~/{os.path.relpath(cwd_abs, root_abs).replace(os.sep, '/')}", file=self.stdout)
+        else:
+            print(cwd_abs, file=self.stdout)
 
     def cmd_mkdir(self, args):
         """(mkdir) Creates a new directory."""
-        if not args: print("Usage: mkdir <directory_name>"); return
+        if not args: self._usage("Usage: mkdir <directory_name>"); return
         try:
-            os.makedirs(args[0], exist_ok=True)
+            os.makedirs(self._resolve_path(args[0]), exist_ok=True)
             print(f"Created directory: {args[0]}")
-        except OSError as e: print(f"{self.RED}Error: Could not create directory: {e}{self.RESET}")
+        except OSError as e: self._error(f"Error: Could not create directory: {e}")
 
     def cmd_touch(self, args):
         """(touch) Creates an empty file or updates its timestamp."""
-        if not args: print("Usage: touch <filename>"); return
+        if not args: self._usage("Usage: touch <filename>"); return
         filename = args[0]
+        path = self._resolve_path(filename)
         try:
-            if os.path.isdir(filename): print(f"{self.RED}Error: '{filename}' is a directory.{self.RESET}"); return
-            with open(filename, 'a'):
-                os.utime(filename, None)
-        except OSError as e: print(f"{self.RED}Error creating/updating file: {e}{self.RESET}")
+            if os.path.isdir(path): self._error(f"Error: '{filename}' is a directory."); return
+            with open(path, 'a'):
+                os.utime(path, None)
+        except OSError as e: self._error(f"Error creating/updating file: {e}")
 
     def cmd_move(self, args):
-        """(move) Moves or renames a file or directory."""
-        if len(args) != 2: print("Usage: move <source> <destination>"); return
+        """(move) Moves or renames a file or directory. Across filesystems it is a parallel copy followed by a delete."""
+        import errno
+        if len(args) != 2: self._usage("Usage: move <source> <destination>"); return
         source, destination = args
+        critical_paths = self._critical_files() + [self.APPLICATIONS_DIR]
+        if self._resolve_path(source) in critical_paths:
+            self._error(f"Error: Cannot move a critical system item '{source}'.")
+            return
+        paths = self._copy_paths(source, destination)
+        if not paths: return
+        src, dst = paths
         try:
-            critical_paths = [os.path.abspath(p) for p in [self.USER_CONFIG_FILE, self.REPO_FILE, self.MAIN_SCRIPT, self.APPLICATIONS_DIR]]
-            if os.path.abspath(source) in critical_paths:
-                print(f"{self.RED}Error: Cannot move a critical system item '{source}'.{self.RESET}")
-                return
-            shutil.move(source, destination)
+            os.rename(src, dst)  # Same filesystem: nothing to copy
             print(f"Moved: {source} -> {destination}")
-        except FileNotFoundError: print(f"{self.RED}Error: Source '{source}' not found.{self.RESET}")
-        except shutil.Error as e: print(f"{self.RED}Error moving item: {e}{self.RESET}")
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                self._error(f"Error moving item: {e}"); return
+
+        summary = self._copy_tree(src, dst, "Moving")
+        if summary is None:
+            self._error(f"Source '{source}' was left in place."); return
+        if os.path.isdir(src) and not os.path.islink(src): self._remove_trees([src])
+        else:
+            try: os.remove(src)
+            except OSError as e: self._error(f"Error removing source after copy: {e}"); return
+        print(f"Moved: {source} -> {destination} ({summary})")
+
+    def cmd_copy(self, args):
+        """(copy) Copies a file or directory, keeping permissions and timestamps."""
+        if len(args) != 2: self._usage("Usage: copy <source> <destination>"); return
+        source, destination = args
+        paths = self._copy_paths(source, destination)
+        if not paths: return
+        summary = self._copy_tree(*paths, "Copying")
+        if summary is not None: print(f"Copied: {source} -> {destination} ({summary})")
+
+    def _copy_paths(self, source, destination):
+        """
+        Resolves copy/move arguments to (source, target). A destination that is an existing
+        directory receives the source inside it. Returns None after reporting a problem.
+        """
+        src, dst = self._resolve_path(source), self._resolve_path(destination)
+        if not os.path.lexists(src):
+            self._error(f"Error: Source '{source}' not found."); return None
+        if os.path.isdir(dst) and not os.path.islink(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        if dst in self._critical_files():
+            self._error("Error: Cannot overwrite a critical system file."); return None
+        if dst == src or (os.path.isdir(src) and dst.startswith(src + os.sep)):
+            self._error(f"Error: Cannot copy or move '{source}' into itself."); return None
+        return src, dst
+
+    def _copy_tree(self, src, dst, verb):
+        """Copies with the tree copier, showing live progress on a terminal. Returns a summary, or None after reporting errors."""
+        progress = self._progress_reporter(verb)
+        started = time.perf_counter()
+        files, size, errors = self.tree_copier.copy(src, dst, progress)
+        if progress: print("\r\033[K", end="")
+        if errors:
+            self._error(f"Error copying: {errors[0]}" + (f" (and {len(errors) - 1} more errors)" if len(errors) > 1 else ""))
+            return None
+        seconds = max(time.perf_counter() - started, 1e-6)
+        return f"{files} files, {self._format_size(size)} in {seconds:.1f}s, {self._format_size(size / seconds)}/s"
 
     def cmd_delf(self, args):
         """(delf) Deletes a file."""
-        if not args: print("Usage: delf <filename>"); return
+        if not args: self._usage("Usage: delf <filename>"); return
         filename = args[0]
         try:
-            critical_files = [os.path.abspath(p) for p in [self.USER_CONFIG_FILE, self.REPO_FILE, self.MAIN_SCRIPT]]
-            if os.path.abspath(filename) in critical_files:
-                print(f"{self.RED}Error: Cannot delete critical system file '{os.path.basename(filename)}'.{self.RESET}"); return
-            os.remove(filename)
+            path = self._resolve_path(filename)
+            if path in self._critical_files():
+                self._error(f"Error: Cannot delete critical system file '{os.path.basename(filename)}'."); return
+            os.remove(path)
             print(f"Deleted file: {filename}")
-        except FileNotFoundError: print(f"{self.RED}Error: File not found: {filename}{self.RESET}")
-        except IsADirectoryError: print(f"{self.RED}Error: '{filename}' is a directory. Use 'deld'.{self.RESET}")
-        except OSError as e: print(f"{self.RED}Error deleting file: {e}{self.RESET}")
+        except FileNotFoundError: self._error(f"Error: File not found: {filename}")
+        except IsADirectoryError: self._error(f"Error: '{filename}' is a directory. Use 'deld'.")
+        except OSError as e: self._error(f"Error deleting file: {e}")
 
     def cmd_deld(self, args):
-        """(deld) Deletes a directory and its contents."""
-        if not args: print("Usage: deld <directory_name>"); return
+        """(deld) Deletes a directory and its contents. With -b, the prompt returns at once and deletion finishes in the background."""
+        background = bool(args) and args[0] in ("-b", "--background")
+        if background: args = args[1:]
+        if not args: self._usage("Usage: deld [-b] <directory_name>"); return
         dirname = args[0]
         try:
-            target_path = os.path.abspath(dirname)
+            target_path = self._resolve_path(dirname)
             if target_path in [os.path.abspath(self.ROOT_PATH), os.path.abspath(self.APPLICATIONS_DIR)]:
-                 print(f"{self.RED}Error: Cannot delete protected directory '{os.path.basename(dirname)}'.{self.RESET}"); return
-            if target_path == os.path.abspath(os.getcwd()):
-                 print(f"{self.RED}Error: Cannot delete the current working directory.{self.RESET}"); return
-
-            shutil.rmtree(dirname)
-            print(f"Deleted directory: {dirname}")
-        except FileNotFoundError: print(f"{self.RED}Error: Directory not found: {dirname}{self.RESET}")
-        except NotADirectoryError: print(f"{self.RED}Error: '{dirname}' is not a directory.{self.RESET}")
-        except OSError as e: print(f"{self.RED}Error deleting directory: {e}{self.RESET}")
+                 self._error(f"Error: Cannot delete protected directory '{os.path.basename(dirname)}'."); return
+            if target_path == self.cwd or self.cwd.startswith(target_path + os.sep):
+                 self._error("Error: Cannot delete the current working directory."); return
+            if not os.path.lexists(target_path): self._error(f"Error: Directory not found: {dirname}"); return
+            if not os.path.isdir(target_path) or os.path.islink(target_path):
+                self._error(f"Error: '{dirname}' is not a directory."); return
+
+            if background:
+                self.tree_remover.discard(target_path)
+                print(f"Deleted directory: {dirname} (finishing in the background)")
+                return
+            stats = self._remove_trees([target_path])
+            if stats: print(f"Deleted directory: {dirname} ({stats})")
+        except OSError as e: self._error(f"Error deleting directory: {e}")
+
+    def _remove_trees(self, paths):
+        """
+        Deletes paths with the tree remover, showing live progress on a terminal.
+        Returns a summary like '1200 files, 4.2M in 0.3s', or None after reporting an error.
+        """
+        progress = self._progress_reporter("Deleting")
+        started = time.perf_counter()
+        files, size, errors = self.tree_remover.remove(paths, progress)
+        if progress: print("\r\033[K", end="")
+        if errors:
+            self._error(f"Error deleting directory: {errors[0]}" + (f" (and {len(errors) - 1} more errors)" if len(errors) > 1 else ""))
+            return None
+        return f"{files} files, {self._format_size(size)} in {time.perf_counter() - started:.1f}s"
+
+    def _progress_reporter(self, verb):
+        """Returns a progress(files, bytes, seconds) callback that redraws one status line, or None if stdout isn't a terminal."""
+        if not sys.stdout.isatty(): return None
+
+        def progress(files, size, seconds):
+            print(f"\r  {verb}... {files} files, {self._format_size(size)} "
+                  f"({files / seconds:.0f} files/s, {self._format_size(size / seconds)}/s)", end="", flush=True)
+        return progress
         
     def cmd_delpanic(self, args=None):
         """(delpanic) EXTREMELY DESTRUCTIVE. Deletes all non-essential files in the root directory."""
+        import random
         preserve_relative = [os.path.basename(p) for p in [self.MAIN_SCRIPT, self.USER_CONFIG_FILE, self.REPO_FILE, self.APPLICATIONS_DIR]]
-        preserve_absolute = [os.path.abspath(p) for p in preserve_relative]
+        preserve_absolute = [os.path.join(self.ROOT_PATH, p) for p in preserve_relative]
         
         sentences = ["All your base are belong to us.", "This command will delete many files."]
         
@@ -362,223 +2108,621 @@ class MyPythonOS:
         print(f"This will delete MOST files/dirs in the root, EXCEPT: {', '.join(preserve_relative)}")
         print(f"{self.RED}This action is IRREVERSIBLE.{self.RESET}")
         
-        try:
-            chosen_sentence = random.choice(sentences)
-            print(f"{self.YELLOW}To confirm, type this sentence exactly:{self.RESET}\n  {chosen_sentence}")
-            if input("> ").strip() != chosen_sentence:
-                print(f"{self.RED}Confirmation failed. Aborting DELPANIC.{self.RESET}"); return
-        except (EOFError, KeyboardInterrupt):
-            print(f"\n{self.RED}Confirmation aborted. Aborting DELPANIC.{self.RESET}"); return
+        chosen_sentence = random.choice(sentences)
+        print(f"{self.YELLOW}To confirm, type this sentence exactly:{self.RESET}\n  {chosen_sentence}")
+        answer = self._ask("> ", "DELPANIC must be confirmed at an interactive prompt.")
+        if answer is None: print(f"{self.RED}Confirmation aborted. Aborting DELPANIC.{self.RESET}"); return
+        if answer != chosen_sentence:
+            self._error("Confirmation failed. Aborting DELPANIC."); return
 
         print(f"{self.GREEN}Confirmation successful. Proceeding...{self.RESET}")
-        deleted_count, error_count = 0, 0
-        
-        for item_name in os.listdir(self.ROOT_PATH):
-            item_path = os.path.abspath(os.path.join(self.ROOT_PATH, item_name))
-            if item_path in preserve_absolute:
-                print(f"Skipping preserved: {item_name}")
-                continue
-            
-            try:
-                print(f"Deleting: {item_name} ... ", end="", flush=True)
-                if os.path.isdir(item_path): shutil.rmtree(item_path)
-                else: os.remove(item_path)
-                print(f"{self.GREEN}OK{self.RESET}"); deleted_count += 1
-            except Exception as e:
-                print(f"{self.RED}ERROR: {e}{self.RESET}"); error_count += 1
-
+        items = [os.path.join(self.ROOT_PATH, name) for name in os.listdir(self.ROOT_PATH)]
+        items = [path for path in items if path not in preserve_absolute]
+        print(f"Deleting {len(items)} items (skipping preserved: {', '.join(preserve_relative)})...")
+        stats = self._remove_trees(items)
+        if stats: print(f"  {stats}")
+        error_count = sum(1 for path in items if os.path.lexists(path))
+        deleted_count = len(items) - error_count
+
+        if not os.path.isdir(self.cwd): self.cwd = self.ROOT_PATH
         print(f"{self.GREEN}--- DELPANIC Complete ---{self.RESET}")
         print(f"Successfully deleted: {deleted_count}. Errors: {error_count}.")
 
     # --- Command Implementations: Applications & Packages ---
 
     def cmd_install(self, args):
-        """(install) Installs an application from a URL or repository name."""
-        if not args: print("Usage: install <url_or_name>\nUse 'repo list' for names."); return
-        identifier = args[0]
-        
+        """(install) Installs applications from URLs or repository names, with their dependencies. Several can be given at once."""
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        replace = bool(args) and args[0] in ("-y", "--yes")
+        if replace: args = args[1:]
+        if not args: self._usage("Usage: install [-y] <url_or_name> [more...]\nUse 'repo list' for names."); return
+
+        identifiers = list(dict.fromkeys(args))
+        graph, results = self._resolve_dependencies(identifiers)
+        cycle = self._find_dependency_cycle(graph)
+        if cycle:
+            self._error(f"Error: Dependency cycle: {' -> '.join(cycle)}. Nothing was installed."); return
+        if len(identifiers) == 1 and list(graph) == identifiers and not results:
+            self._install_app(identifiers[0], installer=graph[identifiers[0]]["installer"], replace=replace)
+            return
+        if len(identifiers) == 1 and not graph:
+            self._install_app(identifiers[0], replace=replace)  # Reports why the installer couldn't be fetched
+            return
+
+        dependencies = [node for node in graph if node not in identifiers]
+        if dependencies: print(f"Dependencies to install: {', '.join(dependencies)}")
+        print(f"Installing {len(graph)} apps ({self.MAX_PARALLEL_INSTALLS} at a time)...")
+        waiting_on = {node: set(info["depends"]) for node, info in graph.items()}
+        dependents = {node: [other for other, info in graph.items() if node in info["depends"]] for node in [*graph, *results]}
+
+        def skip_dependents(node, reason):
+            for dependent in dependents.get(node, []):
+                if dependent not in results:
+                    results[dependent] = (False, reason)
+                    skip_dependents(dependent, reason)
+
+        for node, result in list(results.items()):  # Installers that couldn't be fetched
+            skip_dependents(node, f"Dependency '{node}' could not be resolved.")
+
+        # Each app starts as soon as everything it depends on is installed: independent branches run side by side
+        with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_INSTALLS) as pool:
+            def start(node):
+                return pool.submit(self._install_app, node, interactive=False, installer=graph[node]["installer"], replace=replace)
+            running = {start(node): node for node, deps in waiting_on.items() if not deps and node not in results}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    results[node] = future.result()
+                    if not results[node][0]:
+                        skip_dependents(node, f"Dependency '{node}' failed to install."); continue
+                    for dependent in dependents[node]:
+                        waiting_on[dependent].discard(node)
+                        if not waiting_on[dependent] and dependent not in results:
+                            running[start(dependent)] = dependent
+
+        print("--- Install Summary ---")
+        names = identifiers + [node for node in results if node not in identifiers]
+        max_len = max(len(name) for name in names)
+        for name in names:
+            ok, message = results[name]
+            status = f"{self.GREEN}OK{self.RESET}" if ok else f"{self.RED}FAILED{self.RESET}"
+            print(f"  {name:<{max_len}} : {status} {message}")
+        print(f"Installed: {sum(ok for ok, _ in results.values())}. Failed: {sum(not ok for ok, _ in results.values())}.")
+        if any(not ok for ok, _ in results.values()): self.last_status = 1
+
+    def _resolve_dependencies(self, identifiers):
+        """
+        Fetches the installer configs of the requested apps and, transitively, of their 'depends'
+        entries (concurrently). Dependencies that are already installed are left out.
+        Returns ({identifier: {"installer", "depends"}}, {identifier: (False, message)} for failures).
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        graph, failures, seen = {}, {}, set(identifiers)
+
+        def fetch(identifier):
+            url = self._installer_url(identifier)
+            if not url: raise ValueError(f"Invalid URL or unknown app name: {identifier}")
+            return (url, *self._parse_installer_content(self._fetch_text(url)))
+
+        with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_DOWNLOADS) as pool:
+            running = {pool.submit(fetch, identifier): identifier for identifier in identifiers}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    identifier = running.pop(future)
+                    try:
+                        installer = future.result()
+                    except Exception as e:
+                        failures[identifier] = (False, str(e) if isinstance(e, ValueError) else f"Failed to fetch or parse installer: {e}")
+                        continue
+                    folder_name = installer[1].get("folder-name")
+                    if identifier not in identifiers and folder_name and self._app_dir_installed(folder_name):
+                        continue  # A dependency given by URL that turns out to be installed already
+                    depends = [d for d in dict.fromkeys(installer[1]["depends"]) if not self._dependency_installed(d)]
+                    graph[identifier] = {"installer": installer, "depends": depends}
+                    for dependency in depends:
+                        if dependency not in seen:
+                            seen.add(dependency)
+                            running[pool.submit(fetch, dependency)] = dependency
+
+        for info in graph.values():  # Drop edges to URL dependencies that turned out to be installed
+            info["depends"] = [d for d in info["depends"] if d in graph or d in failures]
+        return graph, failures
+
+    def _dependency_installed(self, identifier):
+        """Whether a 'depends' entry (a command or app name) is satisfied by an installed app."""
+        return identifier in self.installed_apps or any(info["name"] == identifier for info in self.installed_apps.values())
+
+    def _app_dir_installed(self, folder_name):
+        app_dir = os.path.join(self.APPLICATIONS_DIR, folder_name)
+        return any(info["app_dir"] == app_dir for info in self.installed_apps.values())
+
+    @staticmethod
+    def _find_dependency_cycle(graph):
+        """Returns one dependency cycle as a list of identifiers (first == last), or None."""
+        state = {}  # identifier -> "visiting" or "done"
+        for root in graph:
+            if root in state: continue
+            path, stack = [], [(root, iter(graph[root]["depends"]))]
+            state[root] = "visiting"; path.append(root)
+            while stack:
+                node, children = stack[-1]
+                child = next((c for c in children if c in graph), None)
+                if child is None:
+                    state[node] = "done"; stack.pop(); path.pop(); continue
+                if state.get(child) == "visiting":
+                    return path[path.index(child):] + [child]
+                if child not in state:
+                    state[child] = "visiting"; path.append(child)
+                    stack.append((child, iter(graph[child]["depends"])))
+        return None
+
+    def _installer_url(self, identifier):
+        """The installer config URL for a repository name or a direct http(s) URL, or None."""
+        from urllib.parse import urlparse
+        if identifier in self.app_repository: return self.app_repository.get(identifier)["url"]
+        return identifier if urlparse(identifier).scheme in ['http', 'https'] else None
+
+    def _install_app(self, identifier, interactive=True, installer=None, replace=False):
+        """
+        Installs a single application and returns (success, message).
+        The app config and every file are fetched concurrently into a hidden
+        staging directory, which is renamed into place once everything arrived.
+        Non-interactive installs never prompt and refuse to overwrite existing apps unless replace is set.
+        installer is an already fetched (url, installer_data, optional_urls).
+        """
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        from urllib.parse import urlparse
+
+        tag = "" if interactive else f"[{identifier}] "
+
+        def fail(message):
+            self._error(f"{tag}Error: {message}")
+            return False, message
+
+        installer_config_url = installer[0] if installer else self._installer_url(identifier)
+        if not installer_config_url:
+            return fail(f"Invalid URL or unknown app name: {identifier}")
         if identifier in self.app_repository:
-            installer_config_url = self.app_repository[identifier]
-            print(f"Found '{identifier}' in repository. Using: {installer_config_url}")
-        else:
-            installer_config_url = identifier
-            if not urlparse(installer_config_url).scheme in ['http', 'https']:
-                 print(f"{self.RED}Error: Invalid URL or unknown app name: {identifier}{self.RESET}"); return
-            print(f"Using direct installer config URL: {installer_config_url}")
+            print(f"{tag}Found '{identifier}' in repository. Using: {installer_config_url}")
+        elif installer_config_url == identifier:
+            print(f"{tag}Using direct installer config URL: {installer_config_url}")
         
+        if installer:
+            installer_data, optional_urls = installer[1], installer[2]
+        else:
+            try:
+                installer_data, optional_urls = self._parse_installer_content(self._fetch_text(installer_config_url))
+                print(f"{tag}Fetching installer config... {self.GREEN}Success{self.RESET}")
+            except Exception as e:
+                return fail(f"Failed to fetch or parse installer: {e}")
+
+        folder_name = installer_data.get("folder-name")
+        conf_url = installer_data.get("conf-url")
+        script_url = installer_data.get("script-url")
+        if not all([folder_name, conf_url, script_url]):
+            return fail("Installer config is missing required fields.")
+
+        files_to_download = [{"url": script_url, "name": os.path.basename(urlparse(script_url).path), "optional": False}]
+        for opt_url in optional_urls:
+            opt_filename = os.path.basename(urlparse(opt_url).path)
+            if not opt_filename or ".." in opt_filename or "/" in opt_filename or "\\" in opt_filename: continue
+            files_to_download.append({"url": opt_url, "name": opt_filename, "optional": True})
+
+        checksums = dict(installer_data.get("sha256", {}))
+        if any(not re.fullmatch(r"[0-9a-f]{64}", checksum) for checksum in checksums.values()):
+            return fail("Installer config has an invalid sha256 entry.")
+        if None in checksums: checksums.setdefault(files_to_download[0]["name"], checksums.pop(None))
+        unknown = set(checksums) - {item["name"] for item in files_to_download} - {"app.conf"}
+        if unknown:
+            return fail(f"Installer config has a sha256 for unknown file '{sorted(unknown)[0]}'.")
+
+        app_dir = os.path.join(self.APPLICATIONS_DIR, folder_name)
         try:
-            print("Fetching installer config... ", end="", flush=True)
-            installer_resp = requests.get(installer_config_url, timeout=20, allow_redirects=True)
-            installer_resp.raise_for_status()
-            
-            installer_data = {}
-            optional_urls = []
-            for line in installer_resp.text.splitlines():
-                line = line.strip().split('#', 1)[0].strip()
-                if ":" in line:
-                    key, value = map(str.strip, line.split(":", 1))
-                    key = key.lower()
-                    if key == "optional-url": optional_urls.append(value)
-                    else: installer_data[key] = value
-
-            print(f"{self.GREEN}Success{self.RESET}")
-            
-            folder_name = installer_data.get("folder-name")
-            conf_url = installer_data.get("conf-url")
-            script_url = installer_data.get("script-url")
-            if not all([folder_name, conf_url, script_url]):
-                print(f"{self.RED}Error: Installer config is missing required fields.{self.RESET}"); return
-        except Exception as e:
-            print(f"{self.RED}\nError: Failed to fetch or parse installer: {e}{self.RESET}"); return
-        
+            staging_dir = tempfile.mkdtemp(prefix=f".{folder_name}-", dir=self.APPLICATIONS_DIR)
+        except OSError as e:
+            return fail(f"Could not create staging directory: {e}")
+
         try:
-            print("Fetching final app config... ", end="", flush=True)
-            conf_resp = requests.get(conf_url, timeout=20, allow_redirects=True)
-            conf_resp.raise_for_status()
-            final_conf_content = conf_resp.text
-            final_conf_data = self._parse_app_conf_content(final_conf_content)
-            print(f"{self.GREEN}Success{self.RESET}")
+            with ThreadPoolExecutor(max_workers=min(self.MAX_PARALLEL_DOWNLOADS, len(files_to_download) + 1)) as pool:
+                conf_future = pool.submit(self._fetch_conditional, conf_url, sha256=checksums.get("app.conf"))
+                download_futures = [(item, pool.submit(self._download_file, item["url"], os.path.join(staging_dir, item["name"]),
+                                                       checksums.get(item["name"])))
+                                    for item in files_to_download]
+                try:
+                    final_conf_content, conf_validators = conf_future.result()
+                    print(f"{tag}Fetching final app config... {self.GREEN}Success{self.RESET}")
+                except Exception as e:
+                    return fail(f"Failed to fetch final app config: {e}")
+
+                for item, future in download_futures:
+                    if future.result(): continue
+                    if item["optional"]:
+                        print(f"{self.YELLOW}{tag}Warning: Failed to download OPTIONAL file '{item['name']}'. Continuing...{self.RESET}")
+                    else:
+                        return fail(f"Failed to download REQUIRED file '{item['name']}'. Aborting.")
 
+            final_conf_data = self._parse_app_conf_content(final_conf_content)
             app_name = final_conf_data.get("name")
             command = final_conf_data.get("command", app_name)
             if not app_name or not command:
-                print(f"{self.RED}Error: Final app config is invalid.{self.RESET}"); return
-            if hasattr(self, f"cmd_{command}") or command in self.installed_apps:
-                print(f"{self.RED}Error: App command '{command}' conflicts with existing command.{self.RESET}"); return
-        except Exception as e:
-            print(f"{self.RED}\nError: Failed to fetch final app config: {e}{self.RESET}"); return
+                return fail("Final app config is invalid.")
+
+            with self._install_lock:
+                owner = self.installed_apps.get(command)
+                if command in self.builtins or (owner and owner["app_dir"] != app_dir):
+                    return fail(f"App command '{command}' conflicts with existing command.")
+                with open(os.path.join(staging_dir, "app.conf"), "w", encoding='utf-8') as f:
+                    f.write(final_conf_content)
+                with open(os.path.join(staging_dir, self.INSTALL_RECORD), "w") as f:  # What 'upgrade' checks against
+                    json.dump({"installer_url": installer_config_url, "conf_url": conf_url, **conf_validators}, f)
+
+                if os.path.exists(app_dir):
+                    if replace: pass
+                    elif not interactive:
+                        return fail(f"App dir '{self._display_path(app_dir)}' already exists. Use 'install -y' to overwrite it.")
+                    elif (self._ask(f"{self.YELLOW}App dir '{self._display_path(app_dir)}' exists. Overwrite? (y/N): {self.RESET}",
+                                    f"App dir '{self._display_path(app_dir)}' exists. Use 'install -y' to overwrite it.") or "").lower() != 'y':
+                        print("Installation aborted."); self.last_status = 1; return False, "Installation aborted."
+                    try: self._replace_app_dir(staging_dir, app_dir)
+                    except OSError as e: return fail(f"Error replacing existing dir: {e}. Aborted.")
+                else:
+                    os.rename(staging_dir, app_dir)
+                self._setup_app(app_dir)
 
-        app_dir = os.path.join(self.APPLICATIONS_DIR, folder_name)
-        if os.path.exists(app_dir):
-            if input(f"{self.YELLOW}App dir '{os.path.relpath(app_dir)}' exists. Overwrite? (y/N): {self.RESET}").lower() != 'y':
-                print("Installation aborted."); return
-            try: shutil.rmtree(app_dir)
-            except OSError as e: print(f"{self.RED}Error removing existing dir: {e}. Aborted.{self.RESET}"); return
-        
+            print(f"{self.GREEN}{tag}Successfully installed '{app_name}' (command: {command}).{self.RESET}")
+            return True, f"'{app_name}' (command: {command})"
+        except Exception as e:
+            return fail(f"Installation failed: {e}. Cleaning up...")
+        finally:
+            if os.path.exists(staging_dir): shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _replace_app_dir(self, staging_dir, app_dir):
+        """
+        Puts a fully staged app in place of an installed one. The two directories are swapped
+        atomically, so the app never goes missing; the old tree is then deleted in the background.
+        Filesystems without RENAME_EXCHANGE fall back to moving the old tree aside first.
+        """
+        import errno
         try:
-            os.makedirs(app_dir, exist_ok=True)
-            
-            files_to_download = []
-            main_script_filename = os.path.basename(urlparse(script_url).path)
-            files_to_download.append({"url": script_url, "path": os.path.join(app_dir, main_script_filename), "optional": False})
-            
-            for opt_url in optional_urls:
-                opt_filename = os.path.basename(urlparse(opt_url).path)
-                if not opt_filename or ".." in opt_filename or "/" in opt_filename or "\\" in opt_filename: continue
-                files_to_download.append({"url": opt_url, "path": os.path.join(app_dir, opt_filename), "optional": True})
-            
-            installation_success = True
-            for file_item in files_to_download:
-                if not self._download_file(file_item["url"], file_item["path"]):
-                    if file_item["optional"]:
-                        print(f"{self.YELLOW}Warning: Failed to download OPTIONAL file. Continuing...{self.RESET}")
-                    else:
-                        print(f"{self.RED}Error: Failed to download REQUIRED file. Aborting.{self.RESET}")
-                        installation_success = False; break 
-
-            if not installation_success: raise IOError("A required file failed to download.")
+            _exchange_paths(staging_dir, app_dir)
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP): raise
+            self.tree_remover.discard(app_dir)
+            os.rename(staging_dir, app_dir)
+        else:
+            try: self.tree_remover.discard(staging_dir)  # Now holds the old version
+            except OSError: pass  # _install_app's cleanup removes it
+        for command in [c for c, info in self.installed_apps.items() if info["app_dir"] == app_dir]:
+            self._forget_app(command)  # The new version may use another command; warm workers run old code
+
+    def cmd_upgrade(self, args):
+        """(upgrade) Upgrades installed apps whose app.conf changed upstream. Never prompts."""
+        from concurrent.futures import ThreadPoolExecutor
+        if not args: self._usage("Usage: upgrade <app_command_name> [more...] | upgrade --all"); return
+        if args == ["--all"]:
+            commands = sorted(self.installed_apps)
+        else:
+            by_name = {info["name"]: command for command, info in self.installed_apps.items()}
+            commands = list(dict.fromkeys(by_name.get(arg, arg) for arg in args))
+            unknown = [command for command in commands if command not in self.installed_apps]
+            if unknown: self._error(f"Error: App command '{unknown[0]}' not found."); return
+        if not commands: print("No applications installed."); return
+
+        print(f"Checking {len(commands)} apps for updates...")
+        with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_DOWNLOADS) as pool:
+            checks = dict(zip(commands, pool.map(self._check_app_update, commands)))
+
+        outdated = [command for command, check in checks.items() if check["installer"]]
+        results = {command: (check["ok"], check["message"]) for command, check in checks.items() if not check["installer"]}
+        if outdated:
+            print(f"Upgrading {len(outdated)} apps ({self.MAX_PARALLEL_INSTALLS} at a time)...")
+            def upgrade(command):
+                ok, message = self._install_app(command, interactive=False, installer=checks[command]["installer"], replace=True)
+                return ok, checks[command]["message"] if ok else message
+            with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_INSTALLS) as pool:
+                results.update(zip(outdated, pool.map(upgrade, outdated)))
+
+        print("--- Upgrade Summary ---")
+        max_len = max(len(command) for command in commands)
+        for command in commands:
+            ok, message = results[command]
+            if not ok: status = f"{self.RED}FAILED{self.RESET}"
+            elif command in outdated: status = f"{self.GREEN}UPGRADED{self.RESET}"
+            else: status = "OK"
+            print(f"  {command:<{max_len}} : {status} {message}")
+        failed = sum(not ok for ok, _ in results.values())
+        print(f"Upgraded: {sum(ok for command, (ok, _) in results.items() if command in outdated)}. "
+              f"Up to date: {sum(ok for command, (ok, _) in results.items() if command not in outdated)}. Failed: {failed}.")
+        if failed: self.last_status = 1
+
+    def _check_app_update(self, command):
+        """
+        Decides whether an installed app needs upgrading, using a conditional GET of its conf-url.
+        Returns {"ok", "message", "installer"}; installer is the fetched (url, installer_data, optional_urls)
+        when the app should be reinstalled, else None.
+        """
+        info = self.installed_apps[command]
+        try:
+            with open(os.path.join(info["app_dir"], self.INSTALL_RECORD), "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            record = {}  # Installed before records were kept: find it in the repository
+        installer_url = record.get("installer_url") or self._installer_url(info["name"]) or self._installer_url(command)
+        if not installer_url:
+            return {"ok": False, "message": "Not in the repository and no installer URL recorded.", "installer": None}
 
-            with open(os.path.join(app_dir, "app.conf"), "w", encoding='utf-8') as f:
-                f.write(final_conf_content)
+        try:
+            installer = None
+            conf_url = record.get("conf_url")
+            if not conf_url:
+                installer = (installer_url, *self._parse_installer_content(self._fetch_text(installer_url)))
+                conf_url = installer[1].get("conf-url")
+                if not conf_url: raise ValueError("installer config has no conf-url")
+            remote_conf, validators = self._fetch_conditional(conf_url, record)
+            if remote_conf is None:
+                return {"ok": True, "message": f"v{info['version']} is up to date (not modified).", "installer": None}
+            with open(os.path.join(info["app_dir"], "app.conf"), "r", encoding="utf-8") as f:
+                local_conf = f.read()
+            if remote_conf == local_conf:
+                self._update_install_record(info["app_dir"], dict(record, installer_url=installer_url, conf_url=conf_url, **validators))
+                return {"ok": True, "message": f"v{info['version']} is up to date.", "installer": None}
+
+            remote_version = self._parse_app_conf_content(remote_conf).get("version", "N/A")
+            if self._compare_versions(remote_version, info["version"]) < 0:
+                return {"ok": True, "message": f"v{info['version']} is newer than the published v{remote_version}; kept.", "installer": None}
+            if not installer:
+                installer = (installer_url, *self._parse_installer_content(self._fetch_text(installer_url)))
+        except Exception as e:
+            return {"ok": False, "message": f"Update check failed: {e}", "installer": None}
+        change = f"v{info['version']} -> v{remote_version}" if remote_version != info["version"] else f"v{remote_version} (app.conf changed)"
+        return {"ok": True, "message": change, "installer": installer}
 
-            print(f"{self.GREEN}Successfully installed '{app_name}' (command: {command}).{self.RESET}")
-            self._load_applications()
+    def _update_install_record(self, app_dir, record):
+        try:
+            _write_json_atomic(os.path.join(app_dir, self.INSTALL_RECORD), record)
+        except OSError:
+            pass  # Only costs a full download of app.conf next time
 
-        except Exception as e:
-            print(f"{self.RED}Installation failed: {e}. Cleaning up...{self.RESET}")
-            if os.path.exists(app_dir): shutil.rmtree(app_dir)
+    @staticmethod
+    def _compare_versions(a, b):
+        """Compares two version strings part by part (numbers numerically, '1.0rc1' < '1.0'). Returns -1, 0 or 1."""
+        def key(version):
+            return [(0, int(part)) if part.isdigit() else (-1, part) for part in re.findall(r"\d+|[A-Za-z]+", version or "")]
+        a_key, b_key = key(a), key(b)
+        length = max(len(a_key), len(b_key))
+        a_key += [(0, 0)] * (length - len(a_key)); b_key += [(0, 0)] * (length - len(b_key))
+        return (a_key > b_key) - (a_key < b_key)
 
     def cmd_uninstall(self, args):
-        """(uninstall) Removes an installed application."""
-        if not args: print("Usage: uninstall <app_command_name>"); return
+        """(uninstall) Removes an installed application. -y skips the confirmation (required in batch mode)."""
+        confirmed = bool(args) and args[0] in ("-y", "--yes")
+        if confirmed: args = args[1:]
+        if not args: self._usage("Usage: uninstall [-y] <app_command_name>"); return
         command = args[0]
         if command not in self.installed_apps:
-            print(f"{self.RED}Error: App command '{command}' not found.{self.RESET}"); return
+            self._error(f"Error: App command '{command}' not found."); return
         
         app_info = self.installed_apps[command]
         app_dir = app_info['app_dir']
         print(f"{self.YELLOW}--- Uninstall Warning ---{self.RESET}")
         print(f"This will {self.RED}PERMANENTLY DELETE{self.RESET} the app '{app_info['name']}'")
-        print(f"and its directory: {self.PURPLE}{os.path.relpath(app_dir)}{self.RESET}")
+        print(f"and its directory: {self.PURPLE}{self._display_path(app_dir)}{self.RESET}")
         
-        try:
-            if input("Type 'yes' to confirm: ").strip() != 'yes':
-                print("Uninstallation cancelled."); return
-        except (EOFError, KeyboardInterrupt): print("\nUninstallation cancelled."); return
+        if not confirmed:
+            answer = self._ask("Type 'yes' to confirm: ", "Input is not interactive. Use 'uninstall -y' to confirm.")
+            if answer != 'yes':
+                print("Uninstallation cancelled."); self.last_status = 1; return
 
         try:
-            shutil.rmtree(app_dir)
+            self.tree_remover.discard(app_dir)  # Gone from applications/ at once; the files are deleted in the background
             print(f"{self.GREEN}Successfully uninstalled '{app_info['name']}'.{self.RESET}")
-            self._load_applications()
+            self._forget_app(command)
         except OSError as e:
-            print(f"{self.RED}Error removing app directory: {e}{self.RESET}")
+            self._error(f"Error removing app directory: {e}")
 
     def cmd_repo(self, args):
-        """(repo) Manages the application repository. Use 'repo list|update|add|remove'."""
-        if not args: print("Usage: repo <list|update|add|remove> [options]"); return
+        """(repo) Manages the application repository. Use 'repo list|search|info|update|status|add|remove'."""
+        if not args: self._usage("Usage: repo <list|search|info|update|status|add|remove> [options]"); return
         subcommand = args[0].lower()
         
         if subcommand == "list":
-            if not self.app_repository: print("Repository is empty."); return
-            print(f"--- App Repository ('{os.path.basename(self.REPO_FILE)}') ---")
-            max_len = max((len(k) for k in self.app_repository.keys()), default=0)
-            for name, url in sorted(self.app_repository.items()):
-                print(f"  {name:<{max_len}} : {url}")
+            repository = self.app_repository
+            if not repository: print("Repository is empty."); return
+            print(f"--- App Repository ('{os.path.basename(self.REPO_FILE)}') ---", file=self.stdout)
+            self._print_repository_entries([repository.get(name) for name in repository.names()])
+
+        elif subcommand == "search":
+            if len(args) < 2: self._usage("Usage: repo search <terms...>"); return
+            results = self.app_repository.search(" ".join(args[1:]))
+            if not results:
+                print(f"No apps match '{' '.join(args[1:])}'.", file=self.stdout); self.last_status = 1; return
+            self._print_repository_entries(results)
+
+        elif subcommand == "info":
+            if len(args) != 2: self._usage("Usage: repo info <name>"); return
+            entry = self.app_repository.get(args[1])
+            if not entry: self._error(f"Error: Name '{args[1]}' not in repository."); return
+            out = self.stdout
+            print(f"{self.GREEN}{entry['name']}{self.RESET}", file=out)
+            for label, value in (("Version", entry["version"]), ("Description", entry["description"]),
+                                 ("Tags", ", ".join(entry["tags"])), ("Installer", entry["url"])):
+                if value: print(f"  {label + ':':<13}{value}", file=out)
         
         elif subcommand == "update":
-            url = args[1] if len(args) > 1 else self.DEFAULT_REPO_URL
+            import requests
+            url = args[1] if len(args) > 1 else self.repo_url
             print(f"Updating repository from: {url}")
-            if self._download_file(url, self.REPO_FILE):
-                print(f"{self.GREEN}Repository file updated. Reloading...{self.RESET}")
-                self._load_repository()
-            else:
-                print(f"{self.RED}Failed to update repository.{self.RESET}")
+            try:
+                if self._refresh_repository(url, force=True):
+                    print(f"{self.GREEN}Repository updated ({len(self.app_repository)} entries).{self.RESET}")
+                else:
+                    print(f"{self.GREEN}Repository is already up to date.{self.RESET}")
+            except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                self._error(f"Failed to update repository: {e}")
+
+        elif subcommand == "status":
+            state, out = self._load_repository_state(), self.stdout
+            print(f"Source:        {self.repo_url}", file=out)
+            if state.get("url") and state["url"] != self.repo_url:
+                print(f"Last fetched:  {state['url']}", file=out)
+            checked = time.strftime("%Y-%m-%d %H:%M", time.localtime(state["checked_at"])) if state.get("checked_at") else "never"
+            print(f"Last checked:  {checked}", file=out)
+            interval = self.repo_refresh_interval
+            every = "off" if interval <= 0 else f"every {interval / 60:g} minutes" if interval >= 60 else f"every {interval:g} seconds"
+            print(f"Auto refresh:  {every}", file=out)
+            try: local_mtime_ns = os.stat(self.REPO_FILE).st_mtime_ns
+            except OSError: local_mtime_ns = None
+            if self._repository_edited_locally(state, local_mtime_ns):
+                print(f"{self.YELLOW}Local changes: kept until 'repo update' replaces them.{self.RESET}", file=out)
+            if self._repository_refresh_error:
+                print(f"{self.RED}Last refresh failed: {self._repository_refresh_error}{self.RESET}", file=out)
         
         elif subcommand == "add":
-            if len(args) != 3: print("Usage: repo add <name> <url>"); return
+            if len(args) != 3: self._usage("Usage: repo add <name> <url>"); return
             name, url = args[1], args[2]
             if name in self.app_repository:
                 print(f"{self.YELLOW}Warning: Name '{name}' already exists.{self.RESET}")
                 return
-            self.app_repository[name] = url
-            self._save_repository()
+            with self._repository_lock:
+                self.app_repository.add(RepositoryIndex.make_entry(name, url))
+                self._save_repository()
             print(f"{self.GREEN}Added '{name}' to repository.{self.RESET}")
 
         elif subcommand == "remove":
-            if len(args) != 2: print("Usage: repo remove <name>"); return
+            if len(args) != 2: self._usage("Usage: repo remove <name>"); return
             name = args[1]
             if name not in self.app_repository:
-                print(f"{self.RED}Error: Name '{name}' not in repository.{self.RESET}"); return
-            del self.app_repository[name]
-            self._save_repository()
+                self._error(f"Error: Name '{name}' not in repository."); return
+            with self._repository_lock:
+                self.app_repository.remove(name)
+                self._save_repository()
             print(f"{self.GREEN}Removed '{name}' from repository.{self.RESET}")
         
         else:
-            print(f"{self.RED}Error: Unknown repo subcommand '{subcommand}'.{self.RESET}")
+            self._error(f"Error: Unknown repo subcommand '{subcommand}'.")
 
     # --- Command Implementations: Execution & Utility ---
 
     def cmd_help(self, args=None):
         """(help) Shows this help message."""
-        print("Available commands:")
+        out = self.stdout
+        print("Available commands:", file=out)
         
-        command_methods = [m for m in dir(self) if m.startswith('cmd_') and callable(getattr(self, m))]
-        
-        commands = {}
-        for method_name in sorted(command_methods):
-            cmd_name = method_name.replace('cmd_', '')
-            func = getattr(self, method_name)
-            doc = inspect.getdoc(func) or "(No description available)"
-            commands[cmd_name] = f"{self.GREEN}{doc}{self.RESET}"
-
+        commands = {name: f"{self.GREEN}{self._help_text(function)}{self.RESET}" for name, function in self.builtins.items()}
         for name, info in sorted(self.installed_apps.items()):
             commands[name] = f"{self.BLUE}Runs the '{info['name']}' application (v{info['version']}){self.RESET}"
+        for name, expansion in sorted(self.aliases.items()):
+            commands[name] = f"{self.PURPLE}Alias for '{expansion}'{self.RESET}"
             
         max_len = max((len(name) for name in commands.keys()), default=0)
         for name, desc in commands.items():
-            print(f"  {name:<{max_len}} : {desc}")
+            print(f"  {name:<{max_len}} : {desc}", file=out)
 
-        print("\nCommands can be chained with '|' (e.g., ls -l | cowsay)")
+        print("\nCommands can be chained with '|' (e.g., ls -l | cowsay)", file=out)
+
+    def cmd_time(self, args):
+        """(time) Runs a command and reports its wall, user and system time and peak memory. Quote a pipeline to time all of it."""
+        if not args: self._usage("Usage: time <command> [args...]  (or time \"cmd1 | cmd2\")"); return
+        try:
+            import resource
+        except ImportError:
+            resource = None  # Not on Windows: no peak memory figures
+        command_line = args[0] if len(args) == 1 else shlex.join(args)
+        if resource: peaks_before = [resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+        times_before = os.times()
+        started = time.perf_counter()
+        status = self.process_command_line(command_line)
+        seconds = time.perf_counter() - started
+        times_after = os.times()
+
+        # Threads count towards the shell's own times; subprocesses once they have been waited for
+        user = (times_after.user - times_before.user) + (times_after.children_user - times_before.children_user)
+        system = (times_after.system - times_before.system) + (times_after.children_system - times_before.children_system)
+        lines = [("real", f"{seconds:.3f}s"), ("user", f"{user:.3f}s"), ("sys", f"{system:.3f}s")]
+        if resource:
+            # ru_maxrss is a high-water mark over the shell's whole life. It only describes this command if the
+            # command raised it; otherwise all we know is that the command stayed at or below the earlier peak.
+            scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS, KiB elsewhere
+            peaks = []
+            for before, who in zip(peaks_before, (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)):
+                after = resource.getrusage(who).ru_maxrss
+                if who == resource.RUSAGE_CHILDREN and not after: peaks.append("none"); continue
+                size = self._format_size(after * scale)
+                peaks.append(size if after > before else f"<= {size} (earlier peak)")
+            lines.append(("max RSS", f"shell {peaks[0]}, largest child process {peaks[1]}"))
+        sys.stdout.flush()
+        print("", file=sys.stderr)
+        for label, value in lines:
+            print(f"{label:<8}{value}", file=sys.stderr)
+        self.last_status = status
+
+    def cmd_trace(self, args):
+        """(trace) Turns the timing trace of commands, app launches and downloads on or off. Use 'trace on|off|status'."""
+        subcommand = args[0].lower() if args else "status"
+        if subcommand == "on": self.trace_enabled = True
+        elif subcommand == "off": self.trace_enabled = False
+        elif subcommand != "status": self._usage("Usage: trace <on|off|status>"); return
+        state = f"{self.GREEN}on{self.RESET}" if self.trace_enabled else "off"
+        print(f"Tracing is {state} (records go to '{os.path.relpath(self.TRACE_FILE, self.ROOT_PATH)}'; see 'stats').", file=self.stdout)
+
+    def cmd_stats(self, args):
+        """(stats) Shows p50/p95/p99 latencies from the trace. Use 'stats [commands|apps|downloads]' or 'stats clear'."""
+        if args and args[0].lower() == "clear":
+            try: os.remove(self.TRACE_FILE)
+            except FileNotFoundError: pass
+            except OSError as e: self._error(f"Error: Could not clear the trace: {e}"); return
+            print("Trace cleared.", file=self.stdout); return
+        sections = {"commands": "command", "apps": "app", "downloads": "download"}
+        wanted = [sections[arg.lower()] for arg in args if arg.lower() in sections]
+        if len(wanted) != len(args): self._usage("Usage: stats [commands|apps|downloads] | stats clear"); return
+
+        groups = {}  # (kind, name) -> [seconds, ...], plus byte and failure counts for downloads
+        try:
+            with open(self.TRACE_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    try: record = json.loads(line)
+                    except ValueError: continue
+                    if not isinstance(record, dict) or "seconds" not in record: continue
+                    group = groups.setdefault((record.get("kind"), record.get("name")), {"seconds": [], "bytes": 0, "failed": 0})
+                    group["seconds"].append(record["seconds"])
+                    group["bytes"] += record.get("bytes", 0)
+                    group["failed"] += record.get("ok", True) is False or bool(record.get("status"))
+        except FileNotFoundError:
+            print("No trace recorded yet. Turn it on with 'trace on' (or \"trace\": true in user.json).", file=self.stdout); return
+        except OSError as e:
+            self._error(f"Error: Could not read the trace: {e}"); return
+
+        out = self.stdout
+        titles = {"command": "Commands", "app": "App launches", "download": "Downloads (by server)"}
+        for kind in wanted or list(titles):
+            rows = sorted(((name, group) for (k, name), group in groups.items() if k == kind),
+                          key=lambda row: -self._percentile(row[1]["seconds"], 95))
+            if not rows: continue
+            width = max(len(str(name)) for name, _ in rows)
+            print(f"--- {titles[kind]} ---", file=out)
+            print(f"  {'':<{width}} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'failed':>6}", file=out)
+            for name, group in rows:
+                timings = group["seconds"]
+                line = (f"  {str(name):<{width}} {len(timings):>6} " + " ".join(
+                    f"{self._format_latency(value):>9}" for value in (self._percentile(timings, 50), self._percentile(timings, 95),
+                                                                      self._percentile(timings, 99), max(timings)))
+                        + f" {group['failed']:>6}")
+                if kind == "download" and sum(timings):
+                    line += f"  {self._format_size(group['bytes'] / sum(timings))}/s"
+                print(line, file=out)
+
+    @staticmethod
+    def _percentile(values, percent):
+        """The nearest-rank percentile of a list of numbers."""
+        ordered = sorted(values)
+        return ordered[max(0, -(-len(ordered) * percent // 100) - 1)]
+
+    @staticmethod
+    def _format_latency(seconds):
+        return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
 
     def cmd_clear(self, args=None):
         """(clear) Clears the terminal screen."""
@@ -586,131 +2730,348 @@ class MyPythonOS:
 
     def cmd_edit(self, args):
             """(edit) Opens a file in a system text editor (nano/notepad)."""
-            if not args: print("Usage: edit <filename>"); return
+            if not args: self._usage("Usage: edit <filename>"); return
             filename = args[0]
             editor = shutil.which("nano") or (shutil.which("notepad") if os.name == 'nt' else None)
             if not editor:
-                print(f"{self.RED}Error: Text editor ('nano' or 'notepad') not found.{self.RESET}"); return
+                self._error("Error: Text editor ('nano' or 'notepad') not found."); return
             
+            path = self._resolve_path(filename)
             try:
-                if not os.path.exists(filename):
-                    parent_dir = os.path.dirname(filename)
-                    if parent_dir: os.makedirs(parent_dir, exist_ok=True)
-                    open(filename, 'a').close()
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    open(path, 'a').close()
                 
-                subprocess.run([editor, filename])
+                subprocess.run([editor, filename], cwd=self.cwd)
             except KeyboardInterrupt:
                 print("\n^C (Editor closed)")
             except Exception as e:
-                print(f"{self.RED}An unexpected error occurred during editing: {e}{self.RESET}")
+                self._error(f"An unexpected error occurred during editing: {e}")
     
     def cmd_download(self, args):
-        """(download) Downloads a file from a URL."""
-        if not args: print("Usage: download <url> [destination]"); return
+        """(download) Downloads a file from a URL, or every URL listed in a file with 'download -i <file> [dir]'."""
+        overwrite = bool(args) and args[0] in ("-y", "--yes")
+        if overwrite: args = args[1:]
+        if not args: self._usage("Usage: download [-y] <url> [destination]\n       download -i <url_list_file|-> [directory]"); return
+        if args[0] == "-i":
+            if len(args) < 2: self._usage("Usage: download -i <url_list_file|-> [directory]"); return
+            self._download_list(args[1], args[2] if len(args) > 2 else None); return
         url, dest = args[0], args[1] if len(args) > 1 else None
         
         try:
-            filename = os.path.basename(urlparse(url).path) or f"download_{int(time.time())}.dat"
-            filepath = os.path.join(dest, filename) if dest and os.path.isdir(dest) else dest or filename
+            filepath = self._download_target(url, dest)
 
-            if os.path.abspath(filepath) in [os.path.abspath(f) for f in [self.USER_CONFIG_FILE, self.REPO_FILE, self.MAIN_SCRIPT]]:
-                print(f"{self.RED}Error: Cannot overwrite a critical system file.{self.RESET}"); return
+            if self._resolve_path(filepath) in self._critical_files():
+                self._error("Error: Cannot overwrite a critical system file."); return
             
-            if os.path.exists(filepath):
-                if input(f"{self.YELLOW}File '{filepath}' exists. Overwrite? (y/N): {self.RESET}").lower() != 'y':
-                    print("Download cancelled."); return
-
-            self._download_file(url, filepath)
+            if os.path.exists(self._resolve_path(filepath)) and not overwrite:
+                answer = self._ask(f"{self.YELLOW}File '{filepath}' exists. Overwrite? (y/N): {self.RESET}",
+                                   f"File '{filepath}' exists. Use 'download -y' to overwrite it.")
+                if (answer or "").lower() != 'y':
+                    print("Download cancelled."); self.last_status = 1; return
+
+            ok = self._download_segmented(url, self._resolve_path(filepath))
+            if ok is None: ok = self._download_file(url, self._resolve_path(filepath), progress=self._transfer_reporter())
+            if not ok: self.last_status = 1
         except Exception as e:
-            print(f"{self.RED}An unexpected error occurred: {e}{self.RESET}")
+            self._error(f"An unexpected error occurred: {e}")
             
+    def _download_target(self, url, dest, fallback_name=None):
+        """The path (as typed, not resolved) that 'download' saves url to, given an optional file or directory dest."""
+        from urllib.parse import urlparse
+        filename = os.path.basename(urlparse(url).path) or fallback_name or f"download_{int(time.time())}.dat"
+        return os.path.join(dest, filename) if dest and os.path.isdir(self._resolve_path(dest)) else dest or filename
+
+    def _download_list(self, list_file, dest):
+        """
+        'download -i': downloads every URL in list_file ('-' for piped input), at most MAX_PARALLEL_DOWNLOADS
+        at a time and DOWNLOADS_PER_HOST per server. Failed downloads are retried with exponential backoff;
+        files that already exist are skipped, so a rerun picks up whatever failed.
+        """
+        import collections
+        try:
+            if list_file == "-":
+                text = self._piped_input()
+                if text is None: self._error("Error: 'download -i -' reads URLs from a pipe."); return
+            else:
+                with open(self._resolve_path(list_file), "r", encoding="utf-8") as f:
+                    text = f.read()
+            if dest: os.makedirs(self._resolve_path(dest), exist_ok=True)
+        except OSError as e:
+            self._error(f"Error: {e}"); return
+        urls = list(dict.fromkeys(line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")))
+        if not urls: print("No URLs to download."); return
+
+        outcomes, jobs, targets = {}, [], set()  # outcomes: {url: (status, message)}
+        for number, url in enumerate(urls, 1):
+            filepath = self._download_target(url, dest, fallback_name=f"download_{int(time.time())}_{number}.dat")
+            path = self._resolve_path(filepath)
+            if path in self._critical_files(): outcomes[url] = ("FAILED", "Cannot overwrite a critical system file.")
+            elif path in targets: outcomes[url] = ("FAILED", f"Another URL also saves to '{filepath}'.")
+            elif os.path.exists(path): outcomes[url] = ("SKIPPED", f"'{filepath}' exists.")
+            else: jobs.append((url, path)); targets.add(path)
+
+        started = time.perf_counter()
+        downloaded_bytes = 0
+        if jobs:
+            print(f"Downloading {len(jobs)} files ({self.MAX_PARALLEL_DOWNLOADS} at a time, {self.DOWNLOADS_PER_HOST} per server)...")
+            for url, (ok, result) in self._download_many(jobs).items():
+                outcomes[url] = ("OK", self._format_size(result)) if ok else ("FAILED", result)
+                if ok: downloaded_bytes += result
+        seconds = time.perf_counter() - started
+
+        print("--- Download Summary ---")
+        colors = {"OK": self.GREEN, "FAILED": self.RED, "SKIPPED": self.YELLOW}
+        max_len = min(max(len(url) for url in urls), 60)
+        for url in urls:
+            status, message = outcomes[url]
+            print(f"  {url:<{max_len}} : {colors[status]}{status}{self.RESET} {message}")
+        counts = collections.Counter(status for status, _ in outcomes.values())
+        print(f"Downloaded: {counts['OK']} ({self._format_size(downloaded_bytes)} in {self._format_duration(seconds)}). "
+              f"Skipped: {counts['SKIPPED']}. Failed: {counts['FAILED']}.")
+        if counts["FAILED"]: self.last_status = 1
+
+    def _download_many(self, jobs):
+        """
+        Downloads [(url, path), ...] on a thread pool, never running more than DOWNLOADS_PER_HOST
+        transfers against one server. A failure is retried up to DOWNLOAD_RETRIES times after
+        DOWNLOAD_BACKOFF, 2x, 4x... seconds (with jitter) unless the server answered a definite 4xx.
+        Returns {url: (True, size) or (False, reason)}.
+        """
+        import random
+        import collections
+        import requests
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        from urllib.parse import urlparse
+
+        def attempt(url, path):
+            errors = []
+            ok = self._download_file(url, path, errors=errors)
+            return ok, errors[0] if errors else None
+
+        def status_code(error):
+            response = getattr(error, "response", None) if isinstance(error, requests.exceptions.HTTPError) else None
+            return response.status_code if response is not None else None
+
+        def permanent(error):
+            code = status_code(error)
+            return code is not None and 400 <= code < 500 and code not in (408, 429)  # Timeouts and rate limits pass
+
+        results, running = {}, {}
+        pending = collections.deque((url, path, 1) for url, path in jobs)
+        delayed = []  # (ready_at, url, path, attempt)
+        per_host = collections.Counter()
+        with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_DOWNLOADS) as pool:
+            while pending or delayed or running:
+                now = time.monotonic()
+                for item in [d for d in delayed if d[0] <= now]:
+                    delayed.remove(item); pending.append(item[1:])
+                for job in list(pending):  # Start whatever the per-server limit allows, in list order
+                    if len(running) >= self.MAX_PARALLEL_DOWNLOADS: break
+                    host = urlparse(job[0]).netloc
+                    if per_host[host] >= self.DOWNLOADS_PER_HOST: continue
+                    pending.remove(job); per_host[host] += 1
+                    running[pool.submit(attempt, job[0], job[1])] = job
+
+                timeout = max(0.0, min(d[0] for d in delayed) - now) if delayed else None
+                if not running:
+                    time.sleep(timeout); continue
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, path, tries = running.pop(future)
+                    per_host[urlparse(url).netloc] -= 1
+                    ok, error = future.result()
+                    if ok:
+                        results[url] = (True, os.path.getsize(path))
+                    elif tries > self.DOWNLOAD_RETRIES or permanent(error):
+                        reason = f"HTTP {status_code(error)}" if status_code(error) else type(error).__name__ if error else "Download failed"
+                        results[url] = (False, f"{reason} (after {tries} attempt{'s' if tries > 1 else ''})")
+                    else:
+                        delay = self.DOWNLOAD_BACKOFF * 2 ** (tries - 1) * random.uniform(0.8, 1.2)
+                        print(f"{self.YELLOW}Retrying {url} in {delay:.1f}s (attempt {tries + 1} of {self.DOWNLOAD_RETRIES + 1})...{self.RESET}")
+                        delayed.append((time.monotonic() + delay, url, path, tries + 1))
+        return results
+
+    def _download_segmented(self, url, filepath):
+        """
+        Downloads a large file over DOWNLOAD_SEGMENTS ranged connections (see SegmentedDownload),
+        resuming an earlier interrupted attempt. Returns True or False, or None when the file is
+        small or the server doesn't take range requests, so the caller should use _download_file.
+        Segmented downloads skip the download cache: adding them would mean reading the file again.
+        """
+        import requests
+        from urllib.parse import urlparse
+        session = self._get_http_session()
+        try:
+            with self._download_slots:
+                head = session.head(url, timeout=30, allow_redirects=True)
+        except requests.exceptions.RequestException:
+            return None
+        size = int(head.headers.get("Content-Length") or 0)
+        if head.status_code != 200 or head.headers.get("Accept-Ranges", "").lower() != "bytes" or size < self.SEGMENTED_MIN_BYTES:
+            return None
+        if head.headers.get("Content-Encoding", "identity") != "identity": return None  # Ranges would count compressed bytes
+
+        etag = head.headers.get("ETag")
+        validator = etag if etag and not etag.startswith("W/") else head.headers.get("Last-Modified")
+        segments = min(self.DOWNLOAD_SEGMENTS, max(2, size // self.SEGMENTED_MIN_BYTES))
+        job = SegmentedDownload(session, self._download_slots, url, filepath, size, validator, segments, fetch_url=head.url)
+        name = os.path.basename(filepath)
+        if job.resumed:
+            print(f"Resuming {name} at {self._format_size(job.resumed)} of {self._format_size(size)}.")
+        print(f"Downloading {os.path.basename(url)} -> {self._display_path(filepath)} "
+              f"({self._format_size(size)}, {len(job.ranges)} connections)...")
+
+        started = time.perf_counter()
+        progress = self._transfer_reporter()
+        try:
+            job.run(progress)
+        except KeyboardInterrupt:
+            if progress: print("\r\033[K", end="")
+            print(f"{self.YELLOW}Download interrupted. Run the same download again to resume.{self.RESET}")
+            return self._trace_download(url, started, False, filepath, segments=len(job.ranges), error="interrupted")
+        except (requests.exceptions.RequestException, OSError, ValueError) as e:
+            if progress: print("\r\033[K", end="")
+            print(f"{self.RED}Failed: {e}{self.RESET}")
+            if os.path.exists(job.state_path): print("Run the same download again to resume.")
+            return self._trace_download(url, started, False, filepath, segments=len(job.ranges), error=type(e).__name__)
+        if progress: print("\r\033[K", end="")
+        seconds = time.perf_counter() - started
+        print(f"{self.GREEN}Success{self.RESET}: {self._format_size(size - job.resumed)} in {self._format_duration(seconds)} "
+              f"({self._format_size((size - job.resumed) / max(seconds, 1e-6))}/s)")
+        self._trace("download", urlparse(url).netloc, started, url=url, ok=True, bytes=size - job.resumed, segments=len(job.ranges))
+        return True
+
+    def _transfer_reporter(self):
+        """Returns a progress(done, total, transferred, seconds) callback showing throughput and ETA, or None if stdout isn't a terminal."""
+        if not sys.stdout.isatty(): return None
+
+        def progress(done, total, transferred, seconds):
+            rate = transferred / seconds if seconds > 0 else 0
+            line = f"\r  {self._format_size(done)}"
+            if total:
+                line += f" / {self._format_size(total)} ({done * 100 // total}%)"
+            line += f"  {self._format_size(rate)}/s"
+            if total and rate:
+                line += f"  ETA {self._format_duration((total - done) / rate)}"
+            print(f"{line}\033[K", end="", flush=True)
+        return progress
+
+    def cmd_cache(self, args):
+        """(cache) Manages the download cache. Use 'cache stats|clear'."""
+        if not args: self._usage("Usage: cache <stats|clear>"); return
+        subcommand = args[0].lower()
+
+        if subcommand == "stats":
+            stats = self.download_cache.stats()
+            out = self.stdout
+            print(f"--- Download Cache ('{os.path.relpath(self.CACHE_DIR, self.ROOT_PATH)}') ---", file=out)
+            print(f"  URLs    : {stats['entries']}", file=out)
+            print(f"  Objects : {stats['objects']} (deduplicated by content hash)", file=out)
+            print(f"  Size    : {self._format_size(stats['bytes'])} / {self._format_size(stats['max_bytes'])}", file=out)
+            print(f"  Session : {stats['hits']} hits, {stats['misses']} misses", file=out)
+
+        elif subcommand == "clear":
+            freed = self.download_cache.clear()
+            print(f"{self.GREEN}Download cache cleared ({self._format_size(freed)} freed).{self.RESET}")
+
+        else:
+            self._error(f"Error: Unknown cache subcommand '{subcommand}'.")
+
     def cmd_javac(self, args):
-        """(javac) Compiles a .java file into a .class file."""
-        if not args or not args[0].endswith(".java"): print("Usage: javac <filename.java>"); return
+        """(javac) Compiles a .java file into a .class file. Unchanged sources come from the build cache."""
+        if not args or not args[0].endswith(".java"): self._usage("Usage: javac <filename.java>"); return
         filename = args[0]
-        if not shutil.which("javac"): print(f"{self.RED}Error: 'javac' not found. Is JDK installed?{self.RESET}"); return
+        if not os.path.isfile(self._resolve_path(filename)): self._error(f"Error: Java source file not found: {filename}"); return
+        if not shutil.which("javac"): self._error("Error: 'javac' not found. Is JDK installed?"); return
         
-        print(f"Compiling {filename}...")
         try:
-            result = subprocess.run(["javac", filename], capture_output=True, text=True)
-            if result.returncode == 0:
-                print(f"{self.GREEN}Successfully compiled {filename}{self.RESET}")
-                if result.stderr: print(f"{self.YELLOW}Compiler Warnings:\n{result.stderr}{self.RESET}")
-            else:
-                print(f"{self.RED}Compilation failed:{self.RESET}\n{result.stderr}")
+            built = self._cached_build("java", filename)
+            if not built: return
+            entry_dir, cached = built
+            # Like javac itself, every class goes next to its own source: the build's package tree mirrors the source root
+            source_root = self._java_source_root(self._resolve_path(filename))
+            for root, _, names in os.walk(entry_dir):
+                target_dir = os.path.join(source_root, os.path.relpath(root, entry_dir))
+                for name in names:
+                    if not name.endswith(".class"): continue
+                    os.makedirs(target_dir, exist_ok=True)
+                    shutil.copy2(os.path.join(root, name), os.path.join(target_dir, name))
+            print(f"{self.GREEN}Successfully compiled {filename}{' (cached)' if cached else ''}{self.RESET}")
+        except OSError as e:
+            self._error(f"Error: Could not write class files: {e}")
         except KeyboardInterrupt:
             print("\n^C (Compilation cancelled)")
 
     def cmd_gobuild(self, args):
-        """(gobuild) Compiles a .go source file into a binary executable."""
+        """(gobuild) Compiles a .go source file into a binary executable. Unchanged sources come from the build cache."""
         if not args or not args[0].endswith(".go"):
-            print("Usage: gobuild <filename.go> [output_name]"); return
+            self._usage("Usage: gobuild <filename.go> [output_name]"); return
         
         source_file = args[0]
         output_name = args[1] if len(args) > 1 else os.path.splitext(source_file)[0]
 
-        if not os.path.isfile(source_file):
-            print(f"{self.RED}Error: Go source file not found: {source_file}{self.RESET}"); return
+        if not os.path.isfile(self._resolve_path(source_file)):
+            self._error(f"Error: Go source file not found: {source_file}"); return
             
         if not shutil.which("go"):
-            print(f"{self.RED}Error: 'go' command not found. Is Go installed?{self.RESET}"); return
-        
-        print(f"Compiling {source_file} -> {output_name}...")
-        command = ["go", "build", "-o", output_name, source_file]
+            self._error("Error: 'go' command not found. Is Go installed?"); return
         
         try:
-            result = subprocess.run(command, capture_output=True, text=True)
-            if result.returncode == 0:
-                print(f"{self.GREEN}Successfully compiled executable: {output_name}{self.RESET}")
-                if os.name != 'nt':
-                    try: os.chmod(output_name, os.stat(output_name).st_mode | 0o111)
-                    except OSError as e: print(f"{self.YELLOW}Warning: Could not make output executable: {e}{self.RESET}")
-                if result.stderr: print(f"{self.YELLOW}Compiler Messages:\n{result.stderr}{self.RESET}")
-            else:
-                print(f"{self.RED}Go compilation failed:{self.RESET}\n{result.stderr}")
+            built = self._cached_build("go", source_file)
+            if not built: return
+            entry_dir, cached = built
+            output_path = self._resolve_path(output_name)
+            shutil.copy2(os.path.join(entry_dir, self._go_binary_name()), output_path)
+            print(f"{self.GREEN}Successfully compiled executable: {output_name}{' (cached)' if cached else ''}{self.RESET}")
+            if os.name != 'nt':
+                try: os.chmod(output_path, os.stat(output_path).st_mode | 0o111)
+                except OSError as e: print(f"{self.YELLOW}Warning: Could not make output executable: {e}{self.RESET}")
+        except OSError as e:
+            self._error(f"Error: Could not write executable: {e}")
         except KeyboardInterrupt:
             print("\n^C (Compilation cancelled)")
 
-    def cmd_run(self, args):
-        """(run) Executes a script, compiled binary, or Java class."""
-        if not args: print("Usage: run <filename> [args...]"); return
-        filename, script_args = args[0], args[1:]
-        if not os.path.exists(filename): print(f"{self.RED}Error: File not found: {filename}{self.RESET}"); return
+    def cmd_build(self, args):
+        """(build) Manages the build cache used by javac, gobuild and run. Use 'build clean|stats'."""
+        if not args: self._usage("Usage: build <clean|stats>"); return
+        subcommand = args[0].lower()
+
+        if subcommand == "stats":
+            stats = self.build_cache.stats()
+            out = self.stdout
+            print(f"--- Build Cache ('{os.path.relpath(self.BUILD_CACHE_DIR, self.ROOT_PATH)}') ---", file=out)
+            print(f"  Builds  : {stats['entries']}", file=out)
+            print(f"  Size    : {self._format_size(stats['bytes'])}", file=out)
+            print(f"  Session : {stats['hits']} hits, {stats['misses']} compiles", file=out)
+
+        elif subcommand == "clean":
+            freed = self.build_cache.clear()
+            print(f"{self.GREEN}Build cache cleaned ({self._format_size(freed)} freed).{self.RESET}")
 
-        ext = os.path.splitext(filename)[1].lower()
-        interpreters = {
-            ".py": ["python3", "python"], ".js": ["node"], ".lua": ["lua"],
-            ".sh": ["bash", "sh"], ".bash": ["bash", "sh"]
-        }
-        cmd = None
-        
-        if ext in interpreters:
-            for i in interpreters[ext]:
-                if shutil.which(i):
-                    cmd = [i, filename] + script_args; break
-            if not cmd: print(f"{self.RED}Error: No suitable interpreter found for {filename}.{self.RESET}"); return
-        elif ext == ".class":
-            if shutil.which("java"):
-                class_name = os.path.splitext(os.path.basename(filename))[0]
-                class_dir = os.path.dirname(os.path.abspath(filename)) or "."
-                cmd = ["java", "-cp", class_dir, class_name] + script_args
-            else: print(f"{self.RED}Error: 'java' not found for .class file.{self.RESET}"); return
-        elif os.path.isfile(filename) and os.access(filename, os.X_OK):
-             cmd = [os.path.abspath(filename)] + script_args
         else:
-            print(f"{self.RED}Error: Unsupported or non-executable file type for 'run': {filename}{self.RESET}"); return
+            self._error(f"Error: Unknown build subcommand '{subcommand}'.")
+
+    def cmd_run(self, args):
+        """(run) Executes a script, compiled binary, Java class, or .java/.go source (compiled through the build cache)."""
+        if not args: self._usage("Usage: run <filename> [args...]"); return
+        cmd = self._resolve_run_command(args[0], args[1:])
+        if not cmd: return
 
         try:
-            print(f"Running: {' '.join(cmd)}")
-            subprocess.run(cmd, check=True)
+            print(f"Running: {' '.join(cmd)}", flush=True)
+            subprocess.run(cmd, check=True, cwd=self.cwd)
         except KeyboardInterrupt:
             print("\n^C")
-        except subprocess.CalledProcessError as e: print(f"{self.RED}Execution failed with exit code {e.returncode}.{self.RESET}")
-        except Exception as e: print(f"{self.RED}An error occurred while running: {e}{self.RESET}")
+        except subprocess.CalledProcessError as e: self._error(f"Execution failed with exit code {e.returncode}.", status=e.returncode)
+        except Exception as e: self._error(f"An error occurred while running: {e}")
     
     def cmd_cowsay(self, args):
-        """(cowsay) It's a talking cow."""
-        text = " ".join(args) if args else "Moo?"
+        """(cowsay) It's a talking cow. Reads its text from a pipe if no arguments are given."""
+        piped = None if args else self._piped_input()
+        if piped is not None: text = re.sub(r'\033\[[0-9;]*m', '', piped).rstrip("\n") or "Moo?"
+        else: text = " ".join(args) if args else "Moo?"
+        out = self.stdout
         max_width = 40
         
         lines = []
@@ -725,18 +3086,18 @@ class MyPythonOS:
 
         box_width = max(len(line) for line in lines) if lines and any(lines) else 0
         
-        print(" " + "_" * (box_width + 2))
+        print(" " + "_" * (box_width + 2), file=out)
         for i, line in enumerate(lines):
             padding = " " * (box_width - len(line))
             left, right = ("<", ">") if len(lines) == 1 else ("|", "|")
-            print(f" {left} {line}{padding} {right}")
-        print(" " + "-" * (box_width + 2))
+            print(f" {left} {line}{padding} {right}", file=out)
+        print(" " + "-" * (box_width + 2), file=out)
         
-        print("        \   ^__^")
-        print("         \  (oo)\_______")
-        print("            (__)\       )\/\\")
-        print("                ||----w |")
-        print("                ||     ||")
+        print("        \   ^__^", file=out)
+        print("         \  (oo)\_______", file=out)
+        print("            (__)\       )\/\\", file=out)
+        print("                ||----w |", file=out)
+        print("                ||     ||", file=out)
 
     # --- Internal Helper Methods ---
     
@@ -751,32 +3112,146 @@ class MyPythonOS:
                 conf_data[key.strip().lower()] = value.strip()
         return conf_data
     
+    @staticmethod
+    def _format_size(num_bytes):
+        """Formats a byte count as a short human-readable string (e.g. '4.2M')."""
+        for unit in ("B", "K", "M", "G", "T"):
+            if abs(num_bytes) < 1024 or unit == "T":
+                return f"{num_bytes:.0f}{unit}" if unit == "B" else f"{num_bytes:.1f}{unit}"
+            num_bytes /= 1024
+
+    @staticmethod
+    def _format_duration(seconds):
+        """Formats seconds as m:ss or h:mm:ss."""
+        minutes, secs = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+    @staticmethod
+    def _parse_installer_content(content):
+        """
+        Parses an installer config into a dictionary plus the list of its 'optional-url' entries.
+        'depends' (comma-separated repository names or installer URLs, possibly on several lines) becomes a list.
+        'sha256' lines ("<hex> <file name>", or just "<hex>" for the script) become {file name or None: hex}.
+        """
+        installer_data, optional_urls = {"depends": [], "sha256": {}}, []
+        for line in content.splitlines():
+            line = line.strip().split('#', 1)[0].strip()
+            if ":" in line:
+                key, value = map(str.strip, line.split(":", 1))
+                key = key.lower()
+                if key == "optional-url": optional_urls.append(value)
+                elif key == "depends": installer_data["depends"] += [d.strip() for d in value.split(",") if d.strip()]
+                elif key == "sha256":
+                    checksum, _, name = value.partition(" ")
+                    installer_data["sha256"][name.strip() or None] = checksum.lower()
+                else: installer_data[key] = value
+        return installer_data, optional_urls
+
+    def _print_repository_entries(self, entries):
+        """Prints one line per repository entry: name, version, and the description (or the installer URL)."""
+        out = self.stdout
+        name_width = max((len(entry["name"]) for entry in entries), default=0)
+        version_width = max((len(entry["version"] or "") for entry in entries), default=0)
+        out.write("".join(f"  {entry['name']:<{name_width}} {entry['version'] or '':<{version_width}} : "
+                          f"{entry['description'] or entry['url']}\n" for entry in entries))
+
     def _save_repository(self):
-        """Saves the current in-memory repository to the repo.txt file."""
+        """Saves the current in-memory repository to the repo.txt file, in the format it was loaded from."""
         try:
-            with open(self.REPO_FILE, "w") as f:
-                for name, url in sorted(self.app_repository.items()):
-                    f.write(f"{name}\n{url}\n")
+            _write_atomic(self.REPO_FILE, self.app_repository.dump())
+            self._repository_mtime_ns = os.stat(self.REPO_FILE).st_mtime_ns
         except OSError as e:
-            print(f"{self.RED}Error: Could not save repository file: {e}{self.RESET}")
-
-    def _download_file(self, url, filepath):
-        """Downloads a file from a URL to a specified path."""
-        print(f"Downloading {os.path.basename(url)} -> {os.path.relpath(filepath)}... ", end="", flush=True)
+            self._error(f"Error: Could not save repository file: {e}")
+
+    def _get_http_session(self):
+        """Returns the shared HTTP session (one connection pool for all downloads), creating it on first use."""
+        import requests
+        with self._session_lock:
+            if self._http_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.MAX_PARALLEL_DOWNLOADS, pool_maxsize=self.MAX_PARALLEL_DOWNLOADS)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers['User-Agent'] = 'MyPythonOS Downloader/2.0'
+                self._http_session = session
+            return self._http_session
+
+    def _fetch_text(self, url, timeout=20, sha256=None):
+        """Fetches a small text resource (e.g. a config file) and returns its body, checked against sha256 if given."""
+        return self._fetch_conditional(url, timeout=timeout, sha256=sha256)[0]
+
+    def _fetch_conditional(self, url, validators=None, timeout=20, sha256=None):
+        """
+        Like _fetch_text, but revalidates with validators ({"etag", "last_modified"} from an earlier call).
+        Returns (body, validators), with body None when the server answered 304 Not Modified.
+        """
+        import hashlib
+        headers = {}
+        if validators and validators.get("etag"): headers["If-None-Match"] = validators["etag"]
+        if validators and validators.get("last_modified"): headers["If-Modified-Since"] = validators["last_modified"]
+        with self._download_slots:
+            resp = self._get_http_session().get(url, headers=headers, timeout=timeout, allow_redirects=True)
+            if resp.status_code == 304 and headers: return None, validators
+            resp.raise_for_status()
+            if sha256 and hashlib.sha256(resp.content).hexdigest() != sha256:
+                raise ValueError(f"checksum mismatch for {url}")
+            return resp.text, {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+
+    def _download_file(self, url, filepath, sha256=None, progress=None, errors=None):
+        """
+        Downloads a file from a URL to a specified path. Safe to call from several threads.
+        With sha256, the file is hashed as it streams in and discarded (returning False) on a mismatch.
+        progress(done, total, transferred, seconds) is called while the body streams in (see _transfer_reporter).
+        The exception behind a failure is appended to errors, if given.
+        """
+        import hashlib
+        import requests
+        label = f"Downloading {os.path.basename(url)} -> {self._display_path(filepath)}... "
+        transfer_started = time.perf_counter()
         try:
             parent_dir = os.path.dirname(filepath)
             if parent_dir: os.makedirs(parent_dir, exist_ok=True)
             
-            headers = {'User-Agent': f'MyPythonOS Downloader/2.0'}
-            with requests.get(url, stream=True, headers=headers, timeout=30, allow_redirects=True) as r:
-                r.raise_for_status()
-                with open(filepath, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192): f.write(chunk)
-            print(f"{self.GREEN}Success{self.RESET}")
-            return True
-        except requests.exceptions.RequestException: print(f"{self.RED}Failed (Network Error){self.RESET}")
-        except OSError: print(f"{self.RED}Failed (File System Error){self.RESET}")
-        except Exception: print(f"{self.RED}Failed (Unexpected Error){self.RESET}")
+            session = self._get_http_session()
+            with self._download_slots:
+                r = session.get(url, stream=True, headers=self.download_cache.conditional_headers(url), timeout=30, allow_redirects=True)
+                if r.status_code == 304:
+                    r.close()
+                    if self.download_cache.restore(url, filepath, sha256):
+                        print(f"{label}{self.GREEN}Success (cached){self.RESET}")
+                        return self._trace_download(url, transfer_started, True, filepath, cached=True)
+                    r = session.get(url, stream=True, timeout=30, allow_redirects=True)
+                with r:
+                    r.raise_for_status()
+                    digest = hashlib.sha256()
+                    total, done = int(r.headers.get("Content-Length") or 0), 0
+                    started = last_report = time.perf_counter()
+                    with open(filepath, 'wb') as f:
+                        try:
+                            for chunk in r.iter_content(chunk_size=65536):
+                                f.write(chunk); digest.update(chunk)
+                                done += len(chunk)
+                                if progress and time.perf_counter() - last_report >= SegmentedDownload.PROGRESS_INTERVAL:
+                                    last_report = time.perf_counter()
+                                    progress(done, total, done, last_report - started)
+                        finally:
+                            if progress: print("\r\033[K", end="")
+                    if sha256 and digest.hexdigest() != sha256:
+                        print(f"{label}{self.RED}Failed (Checksum Mismatch){self.RESET}")
+                        os.remove(filepath)
+                        return self._trace_download(url, transfer_started, False, filepath, error="checksum mismatch")
+                    self.download_cache.store(url, filepath, digest.hexdigest(), r.headers.get("ETag"), r.headers.get("Last-Modified"))
+            print(f"{label}{self.GREEN}Success{self.RESET}")
+            return self._trace_download(url, transfer_started, True, filepath)
+        except Exception as e:
+            if isinstance(e, requests.exceptions.HTTPError) and e.response is not None: reason = f"HTTP {e.response.status_code}"
+            elif isinstance(e, requests.exceptions.RequestException): reason = "Network Error"
+            elif isinstance(e, OSError): reason = "File System Error"
+            else: reason = "Unexpected Error"
+            print(f"{label}{self.RED}Failed ({reason}){self.RESET}")
+            if errors is not None: errors.append(e)
+            self._trace_download(url, transfer_started, False, filepath, error=reason)
         
         if os.path.exists(filepath):
             try: os.remove(filepath)
@@ -785,75 +3260,488 @@ class MyPythonOS:
 
     def _get_prompt(self):
         """Constructs and returns the command prompt string."""
+        if not os.path.isdir(self.cwd): self.cwd = self.ROOT_PATH  # Our directory was deleted from under us
+        cwd_abs = self.cwd
+        root_abs = os.path.abspath(self.ROOT_PATH)
+        if cwd_abs == root_abs: path_str = "~"
+        elif cwd_abs.startswith(root_abs): path_str = f"~/{os.path.relpath(cwd_abs, root_abs).replace(os.sep, '/')}"
+        else: path_str = cwd_abs
+        return f"{self.GREEN}{self.username}@{self.hostname}{self.RESET}:{self.BLUE}{path_str}{self.RESET} $ "
+
+    def _resolve_run_command(self, filename, script_args):
+        """
+        Builds the argument list used by 'run' for a file, or returns None if it can't be run.
+        The command is meant to be started with cwd=self.cwd.
+        """
+        path = self._resolve_path(filename)
+        if not os.path.exists(path): self._error(f"Error: File not found: {filename}"); return None
+
+        ext = os.path.splitext(filename)[1].lower()
+        interpreters = {
+            ".py": ["python3", "python"], ".js": ["node"], ".lua": ["lua"],
+            ".sh": ["bash", "sh"], ".bash": ["bash", "sh"]
+        }
+        
+        if ext in interpreters:
+            for i in interpreters[ext]:
+                if shutil.which(i): return [i, filename] + script_args
+            self._error(f"Error: No suitable interpreter found for {filename}."); return None
+        elif ext in (".java", ".go"):
+            if ext == ".java" and not shutil.which("java"):
+                self._error("Error: 'java' not found for .java file."); return None
+            built = self._cached_build(ext[1:], filename)
+            if not built: return None
+            if ext == ".go": return [os.path.join(built[0], self._go_binary_name())] + script_args
+            return ["java", "-cp", built[0], self._java_main_class(path)] + script_args
+        elif ext == ".class":
+            if shutil.which("java"):
+                class_name = os.path.splitext(os.path.basename(filename))[0]
+                return ["java", "-cp", os.path.dirname(path), class_name] + script_args
+            self._error("Error: 'java' not found for .class file."); return None
+        elif os.path.isfile(path) and os.access(path, os.X_OK):
+            return [path] + script_args
+        self._error(f"Error: Unsupported or non-executable file type for 'run': {filename}"); return None
+
+    def _cached_build(self, kind, source_file):
+        """
+        Compiles a 'java' or 'go' source (relative to this instance's cwd) through the build cache.
+        Returns (output_dir, from_cache), or None if compilation failed.
+        """
+        source_path = self._resolve_path(source_file)
+        tool = "javac" if kind == "java" else "go"
+        tool_path = shutil.which(tool)
+        if not tool_path:
+            self._error(f"Error: '{tool}' not found. Is the {'JDK' if kind == 'java' else 'Go toolchain'} installed?"); return None
+
+        def probe():
+            result = subprocess.run([tool, "-version" if kind == "java" else "version"], capture_output=True, text=True)
+            return (result.stdout + result.stderr).strip()
+
+        root = self._java_source_root(source_path) if kind == "java" else self._go_module_root(source_path)
+        key = self.build_cache.make_key(kind, self.build_cache.toolchain_version(tool_path, probe),
+                                        self._build_inputs(kind, source_path, root), root)
+        entry_dir = self.build_cache.lookup(key)
+        if entry_dir: return entry_dir, True
+
+        build_dir = self.build_cache.new_build_dir()
+        # The compiler may only read what the key covers: javac resolves other classes from the source root alone
+        # (the empty build dir stands in for the class path), and go resolves its module from the source's directory.
+        if kind == "java": command = ["javac", "-d", build_dir, "-sourcepath", root, "-cp", build_dir, source_path]
+        else: command = ["go", "build", "-o", os.path.join(build_dir, self._go_binary_name()), source_path]
+
+        print(f"Compiling {source_file}...")
+        try:
+            result = subprocess.run(command, capture_output=True, text=True,
+                                    cwd=self.cwd if kind == "java" else os.path.dirname(source_path))
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True); raise
+        if result.returncode != 0:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            self._error(f"Compilation failed:{self.RESET}\n{result.stderr}"); return None
+        if result.stderr: print(f"{self.YELLOW}Compiler Messages:\n{result.stderr}{self.RESET}")
+        return self.build_cache.store(key, build_dir, source_path), False
+
+    def _java_source_root(self, source_path):
+        """The -sourcepath root of a .java file: its directory, minus the directories named by its package."""
+        root = os.path.dirname(source_path)
+        package = self._java_main_class(source_path).split(".")[:-1]
+        for part in reversed(package):
+            if os.path.basename(root) != part: return os.path.dirname(source_path)
+            root = os.path.dirname(root)
+        return root
+
+    @staticmethod
+    def _go_module_root(source_path):
+        """The directory holding the go.mod that governs a .go file, or None if it isn't inside a module."""
+        directory = os.path.dirname(source_path)
+        while True:
+            if os.path.isfile(os.path.join(directory, "go.mod")): return directory
+            parent = os.path.dirname(directory)
+            if parent == directory: return None
+            directory = parent
+
+    def _build_inputs(self, kind, source_path, root):
+        """
+        Every file the compiler can read for a build: all .java files under the source root, or a Go module's
+        go.mod/go.sum/go.work and .go files (just the source itself outside a module, where only the standard
+        library can be imported).
+        """
+        if kind == "go" and root is None: return [source_path]
+        suffixes = (".java",) if kind == "java" else (".go",)
+        names = ("go.mod", "go.sum", "go.work", "go.work.sum") if kind == "go" else ()
+        inputs = []
+        for directory, dirs, files in os.walk(root):
+            # Hidden directories (the shell's caches and trash, .git) are never part of a build
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".") and os.path.join(directory, d) != self.BUILD_CACHE_DIR)
+            inputs += [os.path.join(directory, name) for name in sorted(files) if name.endswith(suffixes) or name in names]
+        return inputs
+
+    @staticmethod
+    def _go_binary_name():
+        return "program.exe" if os.name == 'nt' else "program"
+
+    @staticmethod
+    def _java_main_class(filename):
+        """Returns the fully qualified class name of a .java file, honouring its package declaration."""
+        class_name = os.path.splitext(os.path.basename(filename))[0]
         try:
-            cwd_abs = os.path.abspath(os.getcwd())
-            root_abs = os.path.abspath(self.ROOT_PATH)
-            if cwd_abs == root_abs: path_str = "~"
-            elif cwd_abs.startswith(root_abs): path_str = f"~/{os.path.relpath(cwd_abs, root_abs).replace(os.sep, '/')}"
-            else: path_str = cwd_abs
-            return f"{self.GREEN}{self.username}@{self.hostname}{self.RESET}:{self.BLUE}{path_str}{self.RESET} $ "
+            with open(filename, "r", encoding="utf-8", errors="replace") as f:
+                match = re.search(r'^\s*package\s+([\w.]+)\s*;', f.read(), re.MULTILINE)
         except OSError:
-            os.chdir(self.ROOT_PATH)
-            return f"{self.GREEN}{self.username}@{self.hostname}{self.RESET}:{self.BLUE}~{self.RESET} $ "
+            match = None
+        return f"{match.group(1)}.{class_name}" if match else class_name
 
-    def _run_app(self, command, args):
-        """Handles the execution of an installed application."""
+    def _resolve_app_command(self, command, args):
+        """Builds the argument list for an installed application, or returns None if it can't be run."""
         app_info = self.installed_apps[command]
-        script_file, app_dir = app_info["script"], app_info["app_dir"]
-        original_cwd = os.getcwd()
-        
-        print(f"Running '{app_info['name']}' (v{app_info['version']}) from '{os.path.relpath(app_dir)}/'...")
+        script_file = app_info["script"]
         
         ext = os.path.splitext(script_file)[1].lower()
         interpreters = {".py": ["python3", "python"], ".js": ["node"], ".lua": ["lua"], ".sh": ["bash", "sh"]}
-        cmd = None
         
         if ext in interpreters:
             for i in interpreters[ext]:
-                if shutil.which(i): cmd = [i, script_file] + args; break
-            if not cmd: print(f"{self.RED}Error: Interpreter for app not found.{self.RESET}"); return
+                if shutil.which(i): return [i, script_file] + args
+            self._error("Error: Interpreter for app not found."); return None
         elif os.path.isfile(script_file) and os.access(script_file, os.X_OK):
-             cmd = [script_file] + args
-        else:
-            print(f"{self.RED}Error: Cannot run app '{app_info['name']}'. Not executable or unsupported type.{self.RESET}"); return
+            return [script_file] + args
+        self._error(f"Error: Cannot run app '{app_info['name']}'. Not executable or unsupported type."); return None
 
+    def _run_app(self, command, args):
+        """Handles the execution of an installed application."""
+        app_info = self.installed_apps[command]
+        app_dir = app_info["app_dir"]
+        
+        print(f"Running '{app_info['name']}' (v{app_info['version']}) from '{self._display_path(app_dir)}/'...", flush=True)
+        started = time.perf_counter()
         try:
-            os.chdir(app_dir)
-            # This is now wrapped in its own try/except block
-            subprocess.run(cmd, check=True)
+            self._launch_app(command, args)
+        finally:
+            self._trace("app", command, started, version=app_info["version"], worker=self._uses_app_worker(command), status=self.last_status)
+
+    def _launch_app(self, command, args):
+        """Runs an app (in its warm worker or as a subprocess) and records a failure in last_status."""
+        app_info = self.installed_apps[command]
+        app_dir = app_info["app_dir"]
+        if self._uses_app_worker(command):
+            try:
+                returncode = self._run_app_in_worker(command, args)
+            except KeyboardInterrupt:
+                print("\n^C"); return
+            except OSError as e:
+                self._error(f"An error occurred while running app '{app_info['name']}': {e}"); return
+            if returncode is None:
+                self._error(f"App '{app_info['name']}' crashed.")
+            elif returncode != 0:
+                print(f"{self.YELLOW}App '{app_info['name']}' exited with non-zero status ({returncode}).{self.RESET}")
+                self.last_status = returncode
+            return
+
+        cmd = self._resolve_app_command(command, args)
+        if not cmd: return
+
+        try:
+            # Apps always run from their own directory, whatever our cwd is
+            subprocess.run(cmd, check=True, cwd=app_dir)
         except KeyboardInterrupt:
             # Catch Ctrl+C here, print a newline for a clean prompt, and do nothing else.
             print("\n^C")
         except subprocess.CalledProcessError as e:
             print(f"{self.YELLOW}App '{app_info['name']}' exited with non-zero status ({e.returncode}).{self.RESET}")
+            self.last_status = e.returncode
         except Exception as e:
-            print(f"{self.RED}An error occurred while running app '{app_info['name']}': {e}{self.RESET}")
-        finally:
-            # This ensures we always change back to the original directory
-            os.chdir(original_cwd)
+            self._error(f"An error occurred while running app '{app_info['name']}': {e}")
 
-    # --- Main Loop & Processing ---
+    def _uses_app_worker(self, command):
+        """Whether an app opted into warm in-process execution and this platform supports it."""
+        import socket
+        app_info = self.installed_apps[command]
+        return (app_info.get("mode") in ("inprocess", "forkserver") and app_info["script"].lower().endswith(".py")
+                and hasattr(os, "fork") and hasattr(socket, "send_fds"))
 
-    def process_command_line(self, command_line):
-        """Parses and executes a full command string, including pipes."""
-        if not command_line: return
+    def _run_app_in_worker(self, command, args, stdin_fd=0, stdout_fd=1):
+        """Runs a Python app in its warm AppWorker, starting the worker on first use. Returns the exit code."""
+        app_info = self.installed_apps[command]
+        with self._worker_lock:
+            worker = self._app_workers.get(command)
+            if worker is None or not worker.alive() or worker.script != app_info["script"]:
+                if worker: worker.close()
+                worker = self._app_workers[command] = AppWorker(app_info["script"], app_info["preload"])
+        return worker.run(args, app_info["app_dir"], stdin_fd, stdout_fd)
 
-        command_sequence = [cmd.strip() for cmd in command_line.split('|') if cmd.strip()]
-        for single_command_str in command_sequence:
+    @staticmethod
+    def _split_unquoted(command_line, separator):
+        """Splits a command line on every separator character that is not inside quotes."""
+        parts, current, quote = [], [], None
+        for ch in command_line:
+            if quote:
+                if ch == quote: quote = None
+            elif ch in "'\"": quote = ch
+            elif ch == separator:
+                parts.append("".join(current)); current = []; continue
+            current.append(ch)
+        parts.append("".join(current))
+        return [part.strip() for part in parts if part.strip()]
+
+    def process_command_line(self, command_line):
+        """
+        Parses and executes a full command string, including pipes, and returns its exit
+        status (0 on success). A pipeline fails if any of its stages fails.
+        """
+        self.last_status = 0
+        if not command_line: return 0
+
+        stages = []
+        for single_command_str in self._split_unquoted(command_line, "|"):
             try: parts = shlex.split(single_command_str)
-            except ValueError as e: print(f"{self.RED}Parse Error: {e}. Check quotes.{self.RESET}"); continue
+            except ValueError as e: self._error(f"Parse Error: {e}. Check quotes.", status=2); return self.last_status
             
             if not parts: continue
-            cmd, args = parts[0].lower(), parts[1:]
-            
-            if cmd == "exit": self.running = False; break
-            
-            if hasattr(self, f"cmd_{cmd}"):
-                getattr(self, f"cmd_{cmd}")(args)
+            if parts[0].lower() in self.aliases:  # Expanded once, so an alias may reuse its own name ("ls": "ls -l")
+                try: parts = shlex.split(self.aliases[parts[0].lower()]) + parts[1:]
+                except ValueError as e: self._error(f"Parse Error in alias '{parts[0]}': {e}.", status=2); return self.last_status
+                if not parts: continue
+            stages.append((parts[0].lower(), parts[1:]))
+
+        for cmd, args in stages:
+            if cmd != "exit": continue
+            self.running = False
+            try: self.exit_code = int(args[0]) if args else 0
+            except ValueError: self._usage("Usage: exit [status]"); self.exit_code = 2
+            return self.exit_code
+        if len(stages) > 1: self._run_pipeline(stages); return self.last_status
+
+        for cmd, args in stages:
+            started = time.perf_counter()
+            if cmd in self.builtins:
+                self.builtins[cmd](args)
             elif cmd in self.installed_apps:
                 self._run_app(cmd, args)
             else:
-                print(f"{self.RED}Command not found: {cmd}{self.RESET}")
+                self._error(f"Command not found: {cmd}", status=127)
+            self._trace("command", cmd, started, status=self.last_status)
+        return self.last_status
+
+    def run_batch(self, lines, stop_on_error=False):
+        """
+        Runs command lines non-interactively (used for -c and script files). Each line may
+        hold several ';'-separated commands; blank lines and '#' comments are skipped.
+        Returns the status of the last command, or of the first failure with stop_on_error.
+        """
+        status, self.batch_mode = 0, True
+        for line in lines:
+            for command_line in self._split_unquoted(line, ";"):
+                if command_line.startswith("#"): break
+                status = self.process_command_line(command_line)
+                sys.stdout.flush()  # Keeps redirected output in order with stderr and with the next command's subprocesses
+                if not self.running: return self.exit_code
+                if status and stop_on_error: return status
+        return status
+
+    def _run_pipeline(self, stages):
+        """
+        Runs every stage of a pipeline at the same time, connected by OS pipes.
+        Apps and 'run' targets become subprocesses; builtins run on threads that
+        read from and write to their end of the pipe through self.stdin/self.stdout.
+        """
+        plan = []
+        for cmd, args in stages:
+            if cmd == "run":
+                if not args: self._usage("Usage: run <filename> [args...]"); return
+                argv = self._resolve_run_command(args[0], args[1:])
+                if not argv: return
+                plan.append(("proc", argv, self.cwd))
+            elif cmd in self.builtins:
+                plan.append(("builtin", self.builtins[cmd], args))
+            elif cmd in self.installed_apps and self._uses_app_worker(cmd):
+                plan.append(("worker", cmd, args))
+            elif cmd in self.installed_apps:
+                argv = self._resolve_app_command(cmd, args)
+                if not argv: return
+                plan.append(("proc", argv, self.installed_apps[cmd]["app_dir"]))
+            else:
+                self._error(f"Command not found: {cmd}", status=127); return
+
+        def traced_stage(stage, name, *stage_args):
+            stage_started = time.perf_counter()
+            try: stage(*stage_args)
+            finally: self._trace("command", name, stage_started, pipeline=True)
+
+        procs, threads, read_fd = [], [], None
+        started = time.perf_counter()
+        sys.stdout.flush()  # Anything already printed must come before the stages' output
+        try:
+            for i, ((kind, target, extra), (name, _)) in enumerate(zip(plan, stages)):
+                next_read_fd, write_fd = os.pipe() if i < len(plan) - 1 else (None, None)
+                if kind == "proc":
+                    try:
+                        procs.append((name, subprocess.Popen(target, cwd=extra, stdin=read_fd, stdout=write_fd)))
+                    except OSError as e:
+                        self._error(f"Error starting '{target[0]}': {e}")
+                    finally:
+                        for fd in (read_fd, write_fd):
+                            if fd is not None: os.close(fd)
+                else:
+                    stage = self._run_builtin_stage if kind == "builtin" else self._run_worker_stage
+                    thread = threading.Thread(target=traced_stage, args=(stage, name, target, extra, read_fd, write_fd), daemon=True)
+                    thread.start(); threads.append(thread)
+                read_fd = next_read_fd
+
+            for thread in threads: thread.join()
+            for name, proc in procs:
+                if proc.wait(): self.last_status = proc.returncode
+                self._trace("command", name, started, pipeline=True, status=proc.returncode)
+        except KeyboardInterrupt:
+            for _, proc in procs:
+                if proc.poll() is None: proc.terminate()
+            print("\n^C")
+
+    def _run_builtin_stage(self, method, args, read_fd, write_fd):
+        """Runs a builtin on the current thread with its streams bound to the given pipe ends."""
+        self._streams.stdin = os.fdopen(read_fd, "r", errors="replace") if read_fd is not None else None
+        self._streams.stdout = os.fdopen(write_fd, "w") if write_fd is not None else None
+        try:
+            method(args)
+        except BrokenPipeError:
+            pass  # The next stage stopped reading; that's not an error for us.
+        except Exception as e:
+            self._error(f"Error in pipeline stage: {e}")
+        finally:
+            for stream in (self._streams.stdin, self._streams.stdout):
+                if stream is not None:
+                    try: stream.close()
+                    except OSError: pass
+            self._streams.stdin = self._streams.stdout = None
+
+    def _run_worker_stage(self, command, args, read_fd, write_fd):
+        """Runs an in-process app as a pipeline stage, then releases the shell's copies of its pipe ends."""
+        try:
+            returncode = self._run_app_in_worker(command, args, 0 if read_fd is None else read_fd, 1 if write_fd is None else write_fd)
+            if returncode is None: self._error(f"App '{command}' crashed.")
+            elif returncode: self.last_status = returncode
+        except OSError as e:
+            self._error(f"Error in pipeline stage: {e}")
+        finally:
+            for fd in (read_fd, write_fd):
+                if fd is not None: os.close(fd)
+
+    # --- Daemon Mode ---
+
+    def serve(self, socket_path):
+        """
+        Runs the multi-client daemon on a Unix socket. This warm instance (repository and app
+        index already loaded) forks one session per client; the session gets the client's
+        stdin/stdout/stderr, its own cwd, and reports its exit status back when it ends.
+        """
+        import asyncio
+        self.app_repository  # Parse the repository now so every session inherits it
+        self._start_repository_refresher()
+        try:
+            asyncio.run(self._serve_async(socket_path))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            try: os.remove(socket_path)
+            except OSError: pass
+
+    async def _serve_async(self, socket_path):
+        """Accepts client connections and forks a session for each one."""
+        import asyncio
+        import signal
+        import socket
+        import stat
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGCHLD, self._reap_sessions)
+
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.remove(socket_path)  # Left behind by a daemon that didn't shut down cleanly
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        listener.listen(64)
+        listener.setblocking(False)
+        print(f"MyPythonOS daemon listening on {socket_path} (pid {os.getpid()}).", file=sys.stderr)
+
+        with listener:
+            while True:
+                # sock_accept rather than a stream server: nothing may read from the
+                # connection before the session has received the client's file descriptors.
+                conn, _ = await loop.sock_accept(listener)
+                self._refresh_shared_state()
+                if os.fork() == 0:
+                    status = 1
+                    try:
+                        listener.close()
+                        status = self._run_session(conn)
+                    finally:
+                        try: sys.stdout.flush(); sys.stderr.flush()
+                        except Exception: pass
+                        try: conn.sendall(str(status).encode())
+                        except OSError: pass
+                        os._exit(0)
+                conn.close()
+
+    @staticmethod
+    def _reap_sessions():
+        """Collects the exit status of every finished session process."""
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0: return
+
+    def _refresh_shared_state(self):
+        """Picks up apps and repository entries that earlier sessions changed on disk."""
+        self._load_applications()
+        try:
+            if os.stat(self.REPO_FILE).st_mtime_ns != self._repository_mtime_ns: self._load_repository()
+        except OSError:
+            pass
+
+    def _run_session(self, conn):
+        """Runs one client session inside its forked process and returns its exit status."""
+        import signal
+        import socket
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        conn.setblocking(True)
+
+        message, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+        while message and not message.endswith(b"\n"):
+            chunk = conn.recv(65536)
+            if not chunk: break
+            message += chunk
+        if len(fds) != 3 or not message.endswith(b"\n"): return 2
+        request = json.loads(message)
+
+        for target_fd, fd in enumerate(fds):
+            os.dup2(fd, target_fd); os.close(fd)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+        sys.stderr = open(2, "w", buffering=1, closefd=False)
+        os.setsid()  # Own process group, and detached from the daemon's terminal
+        threading.Thread(target=self._watch_session_connection, args=(conn,), daemon=True).start()
+
+        self.cwd = self.ROOT_PATH
+        self.running, self.exit_code = True, 0
+        if request.get("commands") is not None:
+            return self.run_batch(request["commands"], stop_on_error=request.get("errexit", False))
+        self.library_mode = False
+        print(f"Welcome to MyPythonOS! (daemon session, pid {os.getpid()})")
+        self.run()
+        return self.exit_code
+
+    @staticmethod
+    def _watch_session_connection(conn):
+        """Forwards the client's Ctrl+C to the session's process group, and hangs up when the client leaves."""
+        import signal
+        while True:
+            try: data = conn.recv(64)
+            except OSError: data = b""
+            os.killpg(os.getpgrp(), signal.SIGINT if data else signal.SIGHUP)
+            if not data: return
 
     def run(self):
         """The main loop that reads and executes commands interactively."""
@@ -883,17 +3771,98 @@ class MyPythonOS:
                 print("exit")
                 self.running = False
             except Exception:
+                import traceback
                 print(f"\n{self.RED}--- UNEXPECTED OS ERROR ---{self.RESET}")
                 traceback.print_exc()
 
 
-if __name__ == "__main__":
+_MODULE_LOADED_AT = time.perf_counter()
+
+
+def connect_to_daemon(socket_path, commands=None, errexit=False):
+    """
+    Thin client for 'main.py --serve': hands this terminal's stdin/stdout/stderr to a new
+    daemon session and waits for its exit status. Ctrl+C is forwarded to the session.
+    """
+    import socket
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     try:
-        os_instance = MyPythonOS()
+        conn.connect(socket_path)
+    except OSError as e:
+        print(f"Error: Could not connect to MyPythonOS daemon at '{socket_path}': {e}", file=sys.stderr)
+        return 2
+
+    with conn:
+        request = json.dumps({"commands": commands, "errexit": errexit}).encode() + b"\n"
+        socket.send_fds(conn, [request], [0, 1, 2])
+        reply = b""
+        while True:
+            try:
+                chunk = conn.recv(64)
+            except KeyboardInterrupt:
+                conn.sendall(b"\x03"); continue
+            if not chunk: break
+            reply += chunk
+    return int(reply) if reply.strip() else 1
+
+
+def main(argv=None):
+    """Command-line entry point: the interactive shell, batch mode with -c or a script file, or daemon mode."""
+    import argparse
+    parser = argparse.ArgumentParser(description="MyPythonOS, a fake OS built with Python.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("script", nargs="?", help="run the commands in this file (e.g. setup.nos) and exit")
+    source.add_argument("-c", dest="commands", metavar="COMMANDS", help="run these ';'-separated commands and exit")
+    parser.add_argument("-e", "--errexit", action="store_true", help="batch mode: stop at the first failing command")
+    parser.add_argument("--startup-profile", action="store_true", help="print a per-phase start-up timing breakdown")
+    daemon = parser.add_mutually_exclusive_group()
+    daemon.add_argument("--serve", metavar="SOCKET", help="run a multi-client daemon on this Unix socket")
+    daemon.add_argument("--connect", metavar="SOCKET", help="run the session (or -c/script) in the daemon on this socket")
+    options = parser.parse_args(argv)
+
+    if options.commands is not None:
+        lines = [options.commands]
+    elif options.script is not None:
+        try:
+            with open(options.script, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            print(f"Error: Could not read script '{options.script}': {e}", file=sys.stderr)
+            return 2
+    else:
+        lines = None
+
+    if (options.serve or options.connect) and not hasattr(os, "fork"):
+        print("Error: Daemon mode needs Unix sockets and fork(), which this platform lacks.", file=sys.stderr)
+        return 2
+    if options.connect:
+        return connect_to_daemon(options.connect, lines, options.errexit)
+    if options.serve:
+        os_instance = MyPythonOS(library_mode=True, startup_profile=options.startup_profile)
+        if os_instance.running: os_instance.serve(options.serve)
+        return 0 if os_instance.running else 1
+
+    if lines is None:
+        os_instance = MyPythonOS(startup_profile=options.startup_profile)
         if os_instance.running:
             os_instance.run()
         print(f"{os_instance.ORANGE}MyPythonOS session ended.{os_instance.RESET}")
+        return os_instance.exit_code
+
+    os_instance = MyPythonOS(library_mode=True, startup_profile=options.startup_profile)
+    if not os_instance.running:
+        return 1
+    status = os_instance.run_batch(lines, stop_on_error=options.errexit)
+    os_instance.tree_remover.wait()  # Scripts expect what they deleted to be gone when they finish
+    return status
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
     except Exception:
+        import traceback
         print("\033[91m--- CATASTROPHIC FAILURE ---")
         traceback.print_exc()
         print("MyPythonOS could not start or has crashed unexpectedly.\033[0m")
+        sys.exit(1)